@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def _sorted_quantile(sorted_values, q):
+    # Linear interpolation between closest ranks, same as pandas' quantile()
+    position = q * (len(sorted_values) - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower))
+
+
+def bin_summary(values, nbins=50):
+    # Sort once; the bin counts and every summary statistic are read off the sorted array
+    sorted_values = np.sort(np.asarray(values, dtype='float64'))
+    sorted_values = sorted_values[~np.isnan(sorted_values)]
+    if len(sorted_values) == 0:
+        return {'edges': np.zeros(0), 'counts': np.zeros(0, dtype='int64'), 'count': 0,
+                'mean': np.nan, 'median': np.nan, 'q1': np.nan, 'q3': np.nan}
+
+    low, high = sorted_values[0], sorted_values[-1]
+    if low == high:
+        high = low + 1.0
+    edges = np.linspace(low, high, nbins + 1)
+
+    # Bins are half-open except the last one, which includes the maximum
+    boundaries = np.searchsorted(sorted_values, edges, side='left')
+    boundaries[-1] = len(sorted_values)
+    counts = np.diff(boundaries)
+
+    return {
+        'edges': edges,
+        'counts': counts,
+        'count': len(sorted_values),
+        'mean': float(sorted_values.mean()),
+        'median': _sorted_quantile(sorted_values, 0.5),
+        'q1': _sorted_quantile(sorted_values, 0.25),
+        'q3': _sorted_quantile(sorted_values, 0.75),
+    }
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sources import SOURCE_FILES
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(APP_DIR, 'admin_dashboard.py')
+
+# Arrow IPC variants, fastest to open first. Uncompressed files are memory-mapped with no decode at
+# all; LZ4 and zstd trade a fast decompression for a smaller file. 'parquet' is the shipped file.
+FORMATS = ['arrow', 'lz4', 'zstd', 'parquet']
+COMPRESSION = {'arrow': None, 'lz4': 'lz4', 'zstd': 'zstd'}
+
+# DASHBOARD_FORMAT pins one format (falling back to parquet when that file is missing or stale)
+PINNED_FORMAT = os.environ.get('DASHBOARD_FORMAT')
+
+
+def ipc_path(path, fmt):
+    # 'final_uuid_rating.parquet.gzip' -> 'final_uuid_rating.arrow' / 'final_uuid_rating.lz4.arrow'
+    stem = path.split('.parquet')[0]
+    return f'{stem}.arrow' if fmt == 'arrow' else f'{stem}.{fmt}.arrow'
+
+
+def pick_format(path):
+    # (format, file) to read `path` from: the first converted file at least as new as the parquet
+    # source, otherwise the parquet file itself
+    source_mtime = os.stat(path).st_mtime_ns
+    for fmt in [PINNED_FORMAT] if PINNED_FORMAT else FORMATS:
+        if fmt == 'parquet':
+            break
+        converted = ipc_path(path, fmt)
+        if os.path.exists(converted) and os.stat(converted).st_mtime_ns >= source_mtime:
+            return fmt, converted
+    return 'parquet', path
+
+
+def read_table(path, fmt, columns=None, filters=None):
+    # Only `columns` are kept, and `filters` drop rows (whole row groups when reading parquet)
+    if fmt == 'parquet':
+        return pq.read_table(path, columns=columns, filters=list(filters) if filters else None)
+    # Memory-mapped: uncompressed buffers point straight into the OS page cache, which every
+    # process serving the dashboard shares; pages of columns that are not selected are never read
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    if filters:
+        table = table.filter(pq.filters_to_expression(list(filters)))
+    return table
+
+
+def convert(path, formats=('arrow',)):
+    table = pq.read_table(path)
+    written = {}
+    for fmt in formats:
+        target = ipc_path(path, fmt)
+        # Write next to the target and swap it in, so readers never see a half-written file
+        tmp_path = f'{target}.tmp'
+        options = pa.ipc.IpcWriteOptions(compression=COMPRESSION[fmt])
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, target)
+        written[fmt] = target
+    return written
+
+
+def load_times(paths, formats=FORMATS, repeats=5):
+    # Best-of-`repeats` seconds to open each file in each format, without the dashboard around it
+    times = {}
+    for path in paths:
+        for fmt in formats:
+            file = path if fmt == 'parquet' else ipc_path(path, fmt)
+            if not os.path.exists(file):
+                continue
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                read_table(file, fmt).to_pandas()
+                timings.append(time.perf_counter() - start)
+            times[(path, fmt)] = (min(timings), os.path.getsize(file))
+    return times
+
+
+def first_render_ms():
+    # One cold run of the dashboard script in this interpreter
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def startup_benchmark(formats=FORMATS, repeats=3):
+    # Time to first render per format, each run in a fresh interpreter so no cache carries over
+    results = {}
+    for fmt in formats:
+        timings = []
+        for _ in range(repeats):
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--first-render'],
+                                   env={**os.environ, 'DASHBOARD_FORMAT': fmt}, capture_output=True, text=True)
+            if child.returncode != 0:
+                raise RuntimeError(f'first render with format {fmt} failed:\n{child.stderr}')
+            timings.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        results[fmt] = min(timings)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the dashboard sources to memory-mappable Arrow IPC files.')
+    parser.add_argument('command', nargs='?', choices=['convert', 'benchmark'], default='convert')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS[:-1], default=['arrow'],
+                        help='Arrow IPC variants to write (convert) or compare with parquet (benchmark)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--first-render', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    paths = [path for path in SOURCE_FILES if os.path.exists(path)]
+    if args.first_render:
+        sys.path.insert(0, APP_DIR)
+        print(json.dumps(first_render_ms()))
+    elif args.command == 'convert':
+        for path in paths:
+            start = time.perf_counter()
+            written = convert(path, args.formats)
+            sizes = ' '.join(f'{fmt}={os.path.getsize(file) / 2**20:.1f}MiB' for fmt, file in written.items())
+            print(f'{path}: parquet={os.path.getsize(path) / 2**20:.1f}MiB {sizes} '
+                  f'({time.perf_counter() - start:.1f}s)')
+    else:
+        formats = args.formats + ['parquet']
+        print(f"{'file':<36}{'format':>9}{'MiB':>8}{'load ms':>10}")
+        for (path, fmt), (seconds, size) in load_times(paths, formats, args.repeats).items():
+            print(f'{path:<36}{fmt:>9}{size / 2**20:>8.1f}{seconds * 1000:>10.1f}')
+        print(f"{'format':<9}{'first render ms':>16}")
+        for fmt, ms in startup_benchmark(formats, args.repeats).items():
+            print(f'{fmt:<9}{ms:>16.1f}')
@@ -0,0 +1,168 @@
+import argparse
+import datetime
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from sources import (CATEGORIES, FILE_COHORT, FILE_TIME_PER_DAY, FILE_UPID_RATING, FILE_USERDATA,
+                     FILE_UUID_RATING)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = os.path.join(APP_DIR, 'admin_dashboard.py')
+RESULTS_FILE = 'benchmark_results.jsonl'
+
+# Row counts of the shipped files; a scale factor multiplies these
+SHIPPED_USERS = 26_196
+SHIPPED_PROBLEMS = 11_756
+SHIPPED_DAYS = 366
+SHIPPED_COHORT_MONTHS = 12
+CITIES = ['tp', 'ntpc', 'tc', 'ty', 'ttct', 'kl', 'tn', 'ks', 'hc', 'ml', 'ch', 'yl', 'cy', 'pt', 'il', 'hl']
+
+
+def generate_dataset(directory, scale, seed=0):
+    rng = np.random.default_rng(seed)
+    n_users = int(SHIPPED_USERS * scale)
+    n_problems = int(SHIPPED_PROBLEMS * scale)
+    n_days = int(SHIPPED_DAYS * scale)
+    start = pd.Timestamp('2018-08-01')
+
+    # Students: one rating row per (uuid, category); about half of them are unrated
+    uuids = np.array([f'u{i:09d}' for i in range(n_users)], dtype=object)
+    n_rows = n_users * len(CATEGORIES)
+    num_activities = np.where(rng.random(n_rows) < 0.5, rng.lognormal(2.5, 1.5, n_rows).astype('int64') + 1, 0)
+    accuracy = np.where(num_activities > 0, rng.beta(2, 1.5, n_rows), 0.0)
+    final_curr = np.where(num_activities > 0, rng.normal(1550, 300, n_rows).clip(1), 0.0)
+    pd.DataFrame({
+        'uuid': pd.Categorical(np.repeat(uuids, len(CATEGORIES))),
+        'categories': pd.Categorical(np.tile(CATEGORIES, n_users)),
+        'num_activities': num_activities,
+        'accuracy': accuracy,
+        'accuracy_scaled': accuracy,
+        'init_rating': final_curr,
+        'final_init': final_curr,
+        'final_curr': final_curr,
+    }).to_parquet(os.path.join(directory, FILE_UUID_RATING), compression='gzip')
+
+    pd.DataFrame({
+        'uuid': uuids,
+        'user_city': rng.choice(CITIES, n_users),
+        'first_login_date_TW': (start + pd.to_timedelta(rng.integers(0, n_days, n_users), 'D')).strftime('%Y-%m-%d'),
+        'alias': [f'student_{i}' for i in range(n_users)],
+    }).to_parquet(os.path.join(directory, FILE_USERDATA), compression='gzip')
+
+    pd.DataFrame({
+        'upid': pd.Categorical([f'p{i:08d}' for i in range(n_problems)]),
+        'categories': pd.Categorical(rng.choice(CATEGORIES, n_problems)),
+        'num_activities': rng.lognormal(5, 1, n_problems).astype('int64') + 1,
+        'accuracy': rng.beta(3, 2, n_problems),
+        'accuracy_scaled': 0.0,
+        'init_rating': 1600.0,
+        'final_init': rng.normal(1650, 250, n_problems),
+    }).to_parquet(os.path.join(directory, FILE_UPID_RATING), compression='gzip')
+
+    pd.DataFrame({
+        'date': (start + pd.to_timedelta(np.arange(n_days), 'D')).date,
+        'total_sec_taken': rng.normal(45, 5, n_days),
+        'n_attempts': rng.integers(1_000, 50_000, n_days),
+    }).to_parquet(os.path.join(directory, FILE_TIME_PER_DAY), compression='gzip')
+
+    # Cohort rows grow with the square of the month count, so months scale with sqrt(scale)
+    n_months = max(2, int(SHIPPED_COHORT_MONTHS * scale ** 0.5))
+    first, period = np.triu_indices(n_months)
+    period = period - first
+    months = pd.period_range('2018-08', periods=n_months, freq='M')
+    pd.DataFrame({
+        'First_Mo': months[first],
+        'Order_Mo': months[first + period],
+        'n_customers': (5_000 * scale ** 0.5 * np.exp(-0.4 * period)).astype('int64') + 1,
+        'period_number': period,
+    }).to_parquet(os.path.join(directory, FILE_COHORT), compression='gzip')
+
+
+def _median_ms(action, repeats):
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        action(i)
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 1)
+
+
+def measure_app(repeats=5):
+    # Runs in the data directory; the dashboard reads its files relative to the working directory
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=600).run()
+    cold_start_ms = round((time.perf_counter() - start) * 1000, 1)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    def move_slider(i):
+        low, high = at.slider[0].value
+        at.slider[0].set_range(low, high - datetime.timedelta(days=1 + i)).run()
+
+    def select_city(i):
+        options = at.selectbox[0].options
+        at.selectbox[0].select(options[1 + i % (len(options) - 1)]).run()
+
+    result = {
+        'cold_start_ms': cold_start_ms,
+        # Tabs switch in the browser without a script rerun, so a plain rerun stands in for them
+        'rerun_ms': _median_ms(lambda i: at.run(), repeats),
+        'slider_ms': _median_ms(move_slider, repeats),
+        'selectbox_ms': _median_ms(select_city, repeats),
+        'figure_payload_bytes': sum(len(chart.proto.spec) for chart in at.get('plotly_chart')),
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scales, repeats=5, results_file=RESULTS_FILE):
+    commit = _git_commit()
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, scale)
+            # A fresh interpreter per scale, so caches and peak RSS don't leak between runs
+            child = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', str(repeats)],
+                                   cwd=directory, capture_output=True, text=True)
+        if child.returncode != 0:
+            raise RuntimeError(f'benchmark at scale {scale} failed:\n{child.stderr}')
+
+        record = {'commit': commit, 'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'scale': scale, **json.loads(child.stdout.strip().splitlines()[-1])}
+        with open(results_file, 'a') as results:
+            results.write(json.dumps(record) + '\n')
+        print(json.dumps(record))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard headlessly on synthetic data.')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help='multiples of the shipped data sizes')
+    parser.add_argument('--repeats', type=int, default=5, help='interactions timed per widget')
+    parser.add_argument('--output', default=RESULTS_FILE, help='JSON-lines file results are appended to')
+    parser.add_argument('--measure', type=int, metavar='REPEATS', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        sys.path.insert(0, APP_DIR)
+        print(json.dumps(measure_app(args.measure)))
+    else:
+        run_benchmark(args.scales, args.repeats, args.output)
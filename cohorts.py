@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# Cohort granularity -> pandas period frequency. Weeks run Monday to Sunday.
+GRANULARITIES = {'daily': 'D', 'weekly': 'W-SUN', 'monthly': 'M'}
+
+
+def period_codes(day_codes, granularity):
+    # Days since 1970-01-01 -> integer period codes equal to the pandas Period ordinals, so the
+    # distance between two periods is a plain subtraction
+    day_codes = np.asarray(day_codes, dtype='int64')
+    if granularity == 'daily':
+        return day_codes
+    if granularity == 'weekly':
+        # 1970-01-01 is a Thursday; W-SUN ordinal 1 is the week of 1969-12-29
+        return (day_codes + 3) // 7 + 1
+    if granularity == 'monthly':
+        return day_codes.astype('datetime64[D]').astype('datetime64[M]').astype('int64')
+    raise ValueError(f"Unknown cohort granularity: {granularity!r}")
+
+
+def period_index(codes, granularity):
+    return pd.PeriodIndex.from_ordinals(np.asarray(codes, dtype='int64'), freq=GRANULARITIES[granularity])
+
+
+def cohort_counts(user_codes, day_codes, granularity):
+    # Active users per (cohort, period number) from (user, active day) pairs. A user's cohort is the
+    # period of their first activity; `user_codes` are integers in [0, n_users).
+    user_codes = np.asarray(user_codes, dtype='int64')
+    periods = period_codes(day_codes, granularity)
+    if len(periods) == 0:
+        return pd.DataFrame({'first': np.zeros(0, dtype='int64'), 'order': np.zeros(0, dtype='int64'),
+                             'n_customers': np.zeros(0, dtype='int64')})
+
+    first = np.full(user_codes.max() + 1, np.iinfo('int64').max)
+    np.minimum.at(first, user_codes, periods)
+
+    # Distinct (user, period) pairs, then one count per (first, order) pair
+    span = periods.max() - periods.min() + 1
+    pairs = np.unique(user_codes * span + (periods - periods.min()))
+    pair_users = pairs // span
+    pair_periods = pairs % span + periods.min()
+    cells, n_customers = np.unique(np.stack([first[pair_users], pair_periods]), axis=1, return_counts=True)
+    return pd.DataFrame({'first': cells[0], 'order': cells[1], 'n_customers': n_customers.astype('int64')})
+
+
+def retention_table(counts, granularity):
+    # Percent of each cohort still active n periods later; rows are cohorts, columns period numbers
+    first = counts['first'].to_numpy(dtype='int64')
+    offsets = counts['order'].to_numpy(dtype='int64') - first
+    cohorts, rows = np.unique(first, return_inverse=True)
+    matrix = np.full((len(cohorts), offsets.max() + 1 if len(offsets) else 0), np.nan)
+    matrix[rows, offsets] = counts['n_customers'].to_numpy(dtype='float64')
+
+    retention = pd.DataFrame(matrix / matrix[:, [0]], index=period_index(cohorts, granularity))
+    retention.columns.name = 'period_number'
+    return retention.round(4) * 100
@@ -0,0 +1,251 @@
+import os
+
+import pandas as pd
+
+from accuracy_bins import bin_summary
+from cohorts import cohort_counts, retention_table
+from date_range_index import build_range_index
+from leaderboard import build_leaderboard_index
+from profiling import cache_data as profiled_cache_data
+from profiling import span
+from shared_dataset import CACHE_TTL, current_fingerprint, preload, project, read_shared, wait_for
+from sources import (CATEGORIES, FILE_COHORT, FILE_TIME_PER_DAY, FILE_UPID_RATING, FILE_USER_ACTIVITY, FILE_USERDATA,
+                     FILE_UUID_RATING, SOURCE_FILES, file_fingerprint)
+
+# DASHBOARD_BACKEND=duckdb runs the aggregations in DuckDB directly over the parquet files.
+# pandas is the default, and the fallback when duckdb is not installed.
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+if BACKEND == 'duckdb':
+    try:
+        import duckdb_backend
+    except ImportError:
+        BACKEND = 'pandas'
+
+# Derived results kept per cached function; old file versions age out as new ones arrive
+CACHE_ENTRIES = int(os.environ.get('DASHBOARD_CACHE_ENTRIES', 32))
+
+
+def cache_data(func):
+    # Every derived cache expires with the shared tables (DASHBOARD_CACHE_TTL) and is bounded
+    return profiled_cache_data(func, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+
+
+def start_loading():
+    # Reads every source at once on a thread pool; each section then waits only on its own files.
+    # The DuckDB backend scans the files itself.
+    if BACKEND == 'pandas':
+        preload(SOURCE_FILES, warm=warm_caches)
+
+
+def unavailable_sources(*paths):
+    # (path, error) for each of `paths` that could not be read
+    if BACKEND == 'duckdb':
+        return [(path, FileNotFoundError(path)) for path in paths if not os.path.exists(path)]
+    return wait_for(paths)
+
+
+def source_fingerprint(*paths):
+    # DuckDB reads the files on disk; otherwise the key is the shared version sessions read, which
+    # changes only once a new file has been loaded and warmed
+    if BACKEND == 'duckdb':
+        return file_fingerprint(*paths)
+    return tuple(entry for path in paths for entry in current_fingerprint(path))
+
+
+def rating_fingerprint():
+    return source_fingerprint(FILE_UUID_RATING, FILE_USERDATA)
+
+
+def problem_fingerprint():
+    return source_fingerprint(FILE_UPID_RATING)
+
+
+def time_per_day_fingerprint():
+    return source_fingerprint(FILE_TIME_PER_DAY)
+
+
+def cohort_fingerprint():
+    return source_fingerprint(FILE_COHORT)
+
+
+def activity_fingerprint():
+    return source_fingerprint(FILE_USER_ACTIVITY)
+
+
+def section_reads(min_activities=100):
+    # (path, columns, filters) each dashboard section reads from the rating and user files
+    return {
+        'city': (FILE_UUID_RATING, ['uuid', 'final_curr'], [('final_curr', '>', 0)]),
+        'student_accuracy': (FILE_UUID_RATING, ['uuid', 'categories', 'accuracy'], [('accuracy', '>', 0)]),
+        'problem_accuracy': (FILE_UPID_RATING, ['categories', 'accuracy'], [('accuracy', '>', 0)]),
+        'login': (FILE_UUID_RATING, ['uuid'], None),
+        'leaderboard': (FILE_UUID_RATING, ['uuid', 'num_activities', 'final_curr'],
+                        [('num_activities', '>', min_activities)]),
+        'users': (FILE_USERDATA, ['uuid', 'user_city', 'first_login_date_TW', 'alias'], None),
+    }
+
+
+def source_projections(sections):
+    # Per file, the union of the columns its `sections` read, and their row filter when they all
+    # share one; each section still applies its own filters on top
+    projections = {}
+    for path, columns, filters in sections.values():
+        if path not in projections:
+            projections[path] = (list(columns), filters)
+            continue
+        seen_columns, seen_filters = projections[path]
+        projections[path] = (seen_columns + [column for column in columns if column not in seen_columns],
+                             filters if filters == seen_filters else None)
+    return projections
+
+
+# The shared tables hold only what the sections read
+project(source_projections(section_reads()))
+
+
+def read_section(section, extra_filters=(), min_activities=100):
+    path, columns, filters = section_reads(min_activities)[section]
+    return read_shared(path, columns, list(filters or []) + list(extra_filters))
+
+
+def merge_users(df_rating, user_columns):
+    # Inner join on uuid with only the user columns the caller needs
+    df_userdata_named = read_shared(FILE_USERDATA, ['uuid'] + user_columns)
+    with span('merge') as record:
+        merged_df = pd.merge(df_rating, df_userdata_named, on='uuid', how='inner')
+        record['rows'] = len(merged_df)
+    return merged_df
+
+
+# Raw loaders, keyed on the fingerprint of the files they read
+@cache_data
+def data_ready3(fingerprint):
+    avg_time_per_day = read_shared(FILE_TIME_PER_DAY)
+    return avg_time_per_day
+
+
+@cache_data
+def data_ready4(fingerprint):
+    df_cohort = read_shared(FILE_COHORT)
+    return df_cohort
+
+
+# Derived frames. Each one is memoized on its parameters plus the fingerprint
+# of the sources, so widget reruns never repeat a merge or groupby.
+@cache_data
+def city_data(fingerprint):
+    if BACKEND == 'duckdb':
+        return duckdb_backend.city_data()
+
+    # Students with a rating of zero are filtered out in the parquet reader
+    non_zero_ratings_df = merge_users(read_section('city'), ['user_city'])
+
+    # Calculate average rating and student count per city
+    city_counts = non_zero_ratings_df['user_city'].value_counts().reset_index()
+    city_counts.columns = ['City', 'Student Count']
+    city_counts = city_counts[city_counts['Student Count'] > 0]
+
+    city_ratings = non_zero_ratings_df.groupby('user_city', observed=True)['final_curr'].mean().reset_index()
+    city_ratings.columns = ['City', 'Average Rating']
+
+    return pd.merge(city_counts, city_ratings, on='City')
+
+
+@cache_data
+def student_accuracy(fingerprint, category):
+    category_data = read_section('student_accuracy', [('categories', '==', category)])
+    return merge_users(category_data, [])[['accuracy']]
+
+
+@cache_data
+def problem_accuracy(fingerprint, category):
+    category_data = read_section('problem_accuracy', [('categories', '==', category)])
+    return category_data[['accuracy']].reset_index(drop=True)
+
+
+@cache_data
+def accuracy_histogram(fingerprint, source, category, nbins=50):
+    # Bin counts and summary statistics only; the raw accuracy column never leaves the server
+    if BACKEND == 'duckdb':
+        return duckdb_backend.accuracy_histogram(source, category, nbins)
+    if source == 'student':
+        data = student_accuracy(fingerprint, category)
+    elif source == 'problem':
+        data = problem_accuracy(fingerprint, category)
+    else:
+        raise ValueError(f"Unknown accuracy source: {source!r}")
+    return bin_summary(data['accuracy'].to_numpy(), nbins)
+
+
+@cache_data
+def login_counts_per_day(fingerprint):
+    if BACKEND == 'duckdb':
+        return duckdb_backend.login_counts_per_day()
+    # The rating file has a row per (uuid, category); each student is counted once
+    merged_df = merge_users(read_section('login'), ['first_login_date_TW']).drop_duplicates('uuid')
+    login_date = pd.to_datetime(merged_df['first_login_date_TW']).dt.date.rename('login_date')
+    return merged_df.groupby(login_date).size().reset_index(name='user_count')
+
+
+@cache_data
+def login_range_index(fingerprint):
+    return build_range_index(login_counts_per_day(fingerprint), 'login_date', 'user_count')
+
+
+@cache_data
+def time_range_index(fingerprint):
+    # Days are weighted by their attempt count when the artifact carries one, for a time-weighted mean
+    avg_time_per_day = data_ready3(fingerprint)
+    weight_column = 'n_attempts' if 'n_attempts' in avg_time_per_day.columns else None
+    return build_range_index(avg_time_per_day, 'date', 'total_sec_taken', weight_column)
+
+
+@cache_data
+def active_students(fingerprint, min_activities=100):
+    active_df = merge_users(read_section('leaderboard', min_activities=min_activities), ['alias', 'user_city'])
+    return active_df[['alias', 'user_city', 'num_activities', 'final_curr']]
+
+
+@cache_data
+def leaderboard_index(fingerprint, k=5, min_activities=100):
+    # Top k students by rating and by attempts for every city, built once per data load
+    if BACKEND == 'duckdb':
+        return duckdb_backend.leaderboard_index(k, min_activities)
+    return build_leaderboard_index(active_students(fingerprint, min_activities), k)
+
+
+@cache_data
+def retention_matrix(fingerprint):
+    if BACKEND == 'duckdb':
+        return duckdb_backend.retention_matrix()
+
+    df_cohort = data_ready4(fingerprint)
+    cohort_pivot = df_cohort.pivot_table(index='First_Mo', columns='period_number', values='n_customers')
+
+    cohort_size = cohort_pivot.iloc[:, 0]
+    return cohort_pivot.divide(cohort_size, axis=0).round(4) * 100
+
+
+@cache_data
+def activity_retention_matrix(fingerprint, granularity='monthly'):
+    # Daily, weekly or monthly cohorts from the per-user activity days, one cache entry per granularity
+    user_activity = read_shared(FILE_USER_ACTIVITY, ['uuid', 'day'])
+    with span('cohort_counts') as record:
+        counts = cohort_counts(user_activity['uuid'].cat.codes, user_activity['day'], granularity)
+        record['rows'] = len(user_activity)
+    return retention_table(counts, granularity)
+
+
+def warm_caches():
+    # The views every session opens first, computed for a new file version before it is published
+    rating_fp = rating_fingerprint()
+    city_data(rating_fp)
+    for category in CATEGORIES:
+        accuracy_histogram(rating_fp, 'student', category)
+        accuracy_histogram(problem_fingerprint(), 'problem', category)
+    login_range_index(rating_fp)
+    time_range_index(time_per_day_fingerprint())
+    leaderboard_index(rating_fp)
+    retention_matrix(cohort_fingerprint())
+    if os.path.exists(FILE_USER_ACTIVITY):
+        activity_retention_matrix(activity_fingerprint())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+def build_range_index(df, date_column, value_column, weight_column=None):
+    # Sorted dates plus cumulative sums, so any [start, end] window is two binary searches
+    df = df.sort_values(date_column, kind='stable').reset_index(drop=True)
+    dates = pd.to_datetime(df[date_column]).to_numpy(dtype='datetime64[D]')
+    if weight_column is None:
+        weights = np.ones(len(df))
+    else:
+        weights = df[weight_column].to_numpy(dtype='float64')
+    values = df[value_column].to_numpy(dtype='float64') * weights
+    return {
+        'frame': df,
+        'dates': dates,
+        'value_sums': np.concatenate([[0.0], np.cumsum(values)]),
+        'weight_sums': np.concatenate([[0.0], np.cumsum(weights)]),
+    }
+
+
+def query_range(index, start_date, end_date):
+    lo = int(np.searchsorted(index['dates'], np.datetime64(start_date, 'D'), side='left'))
+    hi = int(np.searchsorted(index['dates'], np.datetime64(end_date, 'D'), side='right'))
+    hi = max(lo, hi)
+    total = index['value_sums'][hi] - index['value_sums'][lo]
+    weight = index['weight_sums'][hi] - index['weight_sums'][lo]
+    return {
+        'frame': index['frame'].iloc[lo:hi],
+        'total': float(total),
+        'weight': float(weight),
+        'mean': float(total / weight) if weight else np.nan,
+    }
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the visual shape of a series with `threshold` points
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    selected = np.empty(threshold, dtype='int64')
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+        # Average of the next bucket is the third corner of the triangle
+        next_end = bucket_edges[bucket + 2] if bucket + 2 < len(bucket_edges) else n
+        next_start = end
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_frame(frame, x_column, y_column, threshold=1000):
+    if len(frame) <= threshold:
+        return frame
+    x = pd.to_datetime(frame[x_column]).to_numpy(dtype='datetime64[D]').astype('int64')
+    return frame.iloc[lttb_indices(x, frame[y_column].to_numpy(), threshold)]
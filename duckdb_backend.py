@@ -0,0 +1,192 @@
+import argparse
+import os
+import threading
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from leaderboard import ALL_CITIES
+from sources import CATEGORIES, FILE_COHORT, FILE_UPID_RATING, FILE_USERDATA, FILE_UUID_RATING
+
+# Out-of-core settings: DuckDB spills to DUCKDB_TEMP_DIR once DUCKDB_MEMORY_LIMIT is reached
+DUCKDB_CONFIG = {
+    'threads': int(os.environ.get('DUCKDB_THREADS', os.cpu_count() or 1)),
+    'memory_limit': os.environ.get('DUCKDB_MEMORY_LIMIT', '1GB'),
+    'temp_directory': os.environ.get('DUCKDB_TEMP_DIR', '.duckdb_tmp'),
+}
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def _cursor():
+    # One in-process database per process; each caller gets its own cursor, as a
+    # DuckDB connection must not be shared across threads
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = duckdb.connect(config=DUCKDB_CONFIG)
+        return _connection.cursor()
+
+
+def _parquet(path, **options):
+    path = path.replace("'", "''")
+    extra = ''.join(f', {key}={value}' for key, value in options.items())
+    return f"read_parquet('{path}'{extra})"
+
+
+def city_data():
+    # Students without a city are left out, as pandas' groupby and value_counts drop them
+    return _cursor().execute(f"""
+        SELECT u.user_city AS "City", count(*) AS "Student Count", avg(r.final_curr) AS "Average Rating"
+        FROM {_parquet(FILE_UUID_RATING)} r JOIN {_parquet(FILE_USERDATA)} u USING (uuid)
+        WHERE r.final_curr > 0 AND u.user_city IS NOT NULL
+        GROUP BY u.user_city
+        ORDER BY "Student Count" DESC, "City"
+    """).df()
+
+
+def accuracy_histogram(source, category, nbins=50):
+    if source == 'student':
+        relation = f'{_parquet(FILE_UUID_RATING)} r JOIN {_parquet(FILE_USERDATA)} u USING (uuid)'
+    elif source == 'problem':
+        relation = f'{_parquet(FILE_UPID_RATING)} r'
+    else:
+        raise ValueError(f"Unknown accuracy source: {source!r}")
+    where = 'r.categories = ? AND r.accuracy > 0'
+    cursor = _cursor()
+
+    count, low, high, mean, q1, median, q3 = cursor.execute(f"""
+        SELECT count(*), min(r.accuracy), max(r.accuracy), avg(r.accuracy),
+               quantile_cont(r.accuracy, 0.25), quantile_cont(r.accuracy, 0.5), quantile_cont(r.accuracy, 0.75)
+        FROM {relation} WHERE {where}
+    """, [category]).fetchone()
+    if count == 0:
+        return {'edges': np.zeros(0), 'counts': np.zeros(0, dtype='int64'), 'count': 0,
+                'mean': np.nan, 'median': np.nan, 'q1': np.nan, 'q3': np.nan}
+
+    # Same edges and half-open bins as accuracy_bins.bin_summary: count the values below each edge
+    edges = np.linspace(low, high if high > low else low + 1.0, nbins + 1)
+    # Edges are bound as DOUBLE parameters; numeric literals would be parsed as DECIMAL and rounded
+    below = ', '.join(['count(*) FILTER (WHERE r.accuracy < ?::DOUBLE)'] * nbins)
+    boundaries = cursor.execute(f'SELECT {below} FROM {relation} WHERE {where}',
+                                [float(edge) for edge in edges[:-1]] + [category]).fetchone()
+    boundaries = np.asarray(boundaries + (count,), dtype='int64')
+    return {'edges': edges, 'counts': np.diff(boundaries), 'count': int(count),
+            'mean': float(mean), 'median': float(median), 'q1': float(q1), 'q3': float(q3)}
+
+
+def login_counts_per_day():
+    # Students without a login date are left out, as the pandas groupby drops them
+    df = _cursor().execute(f"""
+        SELECT CAST(u.first_login_date_TW AS DATE) AS login_date, count(DISTINCT uuid) AS user_count
+        FROM {_parquet(FILE_UUID_RATING)} r JOIN {_parquet(FILE_USERDATA)} u USING (uuid)
+        WHERE u.first_login_date_TW IS NOT NULL
+        GROUP BY login_date
+        ORDER BY login_date
+    """).df()
+    df['login_date'] = pd.to_datetime(df['login_date']).dt.date
+    return df
+
+
+def leaderboard_index(k=5, min_activities=100):
+    # Ties are broken by (alias, user_city), the order pandas' stable sort over the groupby leaves them in.
+    # Rows missing either key are dropped, as the pandas groupby drops them
+    df = _cursor().execute(f"""
+        WITH active AS (
+            SELECT u.alias, u.user_city, r.num_activities, r.final_curr, r.file_row_number
+            FROM {_parquet(FILE_UUID_RATING, file_row_number='true')} r JOIN {_parquet(FILE_USERDATA)} u USING (uuid)
+            WHERE r.num_activities > ? AND u.user_city IS NOT NULL AND u.alias IS NOT NULL
+        ), grouped AS (
+            SELECT alias, user_city, sum(num_activities) AS attempt_count, avg(final_curr) AS average_rating,
+                   min(min(file_row_number)) OVER (PARTITION BY user_city) AS city_order
+            FROM active GROUP BY alias, user_city
+        ), ranked AS (
+            SELECT *,
+                   row_number() OVER (PARTITION BY user_city ORDER BY average_rating DESC, alias, user_city) AS city_rating_rank,
+                   row_number() OVER (PARTITION BY user_city ORDER BY attempt_count DESC, alias, user_city) AS city_attempt_rank,
+                   row_number() OVER (ORDER BY average_rating DESC, alias, user_city) AS rating_rank,
+                   row_number() OVER (ORDER BY attempt_count DESC, alias, user_city) AS attempt_rank
+            FROM grouped
+        )
+        SELECT * FROM ranked
+        WHERE city_rating_rank <= ? OR city_attempt_rank <= ? OR rating_rank <= ? OR attempt_rank <= ?
+    """, [min_activities, k, k, k, k]).df()
+
+    columns = ['alias', 'user_city', 'attempt_count', 'average_rating']
+
+    def top(frame, rank):
+        return frame[frame[rank] <= k].sort_values(rank)[columns].reset_index(drop=True)
+
+    index = {ALL_CITIES: (top(df, 'rating_rank'), top(df, 'attempt_rank'))}
+    for city, df_city in sorted(df.groupby('user_city'), key=lambda item: item[1]['city_order'].iloc[0]):
+        index[city] = (top(df_city, 'city_rating_rank'), top(df_city, 'city_attempt_rank'))
+    return index
+
+
+def retention_matrix():
+    df_cohort = _cursor().execute(f"""
+        SELECT First_Mo, period_number, n_customers FROM {_parquet(FILE_COHORT)}
+    """).df()
+    # Period columns are stored as month ordinals
+    df_cohort['First_Mo'] = pd.PeriodIndex.from_ordinals(df_cohort['First_Mo'], freq='M')
+    cohort_pivot = df_cohort.pivot_table(index='First_Mo', columns='period_number', values='n_customers')
+
+    cohort_size = cohort_pivot.iloc[:, 0]
+    return cohort_pivot.divide(cohort_size, axis=0).round(4) * 100
+
+
+def check_against_pandas():
+    # Runs every aggregation on both backends and reports any difference
+    import data_layer
+
+    data_layer.BACKEND = 'pandas'
+    fingerprint = data_layer.rating_fingerprint()
+    mismatches = []
+
+    def compare(name, expected, actual):
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_categorical=False,
+                                          check_index_type=False, check_column_type=False)
+        except AssertionError as error:
+            mismatches.append(f'{name}: {error}')
+
+    by_city = ['City']
+    compare('city_data',
+            data_layer.city_data(fingerprint).astype({'City': str}).sort_values(by_city, ignore_index=True),
+            city_data().astype({'City': str}).sort_values(by_city, ignore_index=True))
+
+    for source in ['student', 'problem']:
+        for category in CATEGORIES:
+            expected = data_layer.accuracy_histogram(fingerprint, source, category)
+            actual = accuracy_histogram(source, category)
+            if not (np.array_equal(expected['counts'], actual['counts'])
+                    and np.allclose([expected[key] for key in ['mean', 'median', 'q1', 'q3']],
+                                    [actual[key] for key in ['mean', 'median', 'q1', 'q3']])):
+                mismatches.append(f'accuracy_histogram({source}, {category})')
+
+    compare('login_counts_per_day', data_layer.login_counts_per_day(fingerprint), login_counts_per_day())
+
+    expected_index = data_layer.leaderboard_index(fingerprint)
+    actual_index = leaderboard_index()
+    if [str(city) for city in expected_index] != [str(city) for city in actual_index]:
+        mismatches.append('leaderboard_index: city order differs')
+    for city, (expected_rating, expected_attempt) in expected_index.items():
+        actual_rating, actual_attempt = actual_index.get(city, (pd.DataFrame(), pd.DataFrame()))
+        compare(f'leaderboard_index[{city}] rating', expected_rating.astype({'user_city': str}),
+                actual_rating.astype({'user_city': str}))
+        compare(f'leaderboard_index[{city}] attempts', expected_attempt.astype({'user_city': str}),
+                actual_attempt.astype({'user_city': str}))
+
+    compare('retention_matrix', data_layer.retention_matrix(data_layer.cohort_fingerprint()), retention_matrix())
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the DuckDB backend against the pandas backend.')
+    parser.parse_args()
+
+    mismatches = check_against_pandas()
+    print('\n'.join(mismatches) if mismatches else 'DuckDB and pandas backends agree')
+    raise SystemExit(1 if mismatches else 0)
@@ -0,0 +1,173 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import FILE_LOG_PROCESSED
+from sources import CATEGORIES, FILE_UPID_RATING, FILE_UUID_RATING
+
+FILE_CONTENT_PROCESSED = 'Processed_Info_Content.parquet.gzip'
+ATTEMPT_COLUMNS = ['uuid', 'upid', 'timestamp_TW', 'is_correct']
+
+# Ratings start at BASE_RATING + SCALE * (accuracy z-score); problems use the negated z-score
+BASE_RATING = 1600
+SCALE = 400
+K_FACTOR = 32
+
+
+def assign_waves(student_codes, problem_codes, n_students, n_problems):
+    # Wave of an attempt = 1 + wave of the latest earlier attempt sharing its student or problem.
+    # Attempts in one wave touch disjoint students and problems, so a wave is applied as one
+    # vectorized update and the result equals the sequential replay.
+    # The waves themselves come from a sequential pass over the attempts in plain Python: each
+    # wave depends on the one before it for the same student or problem. This pass, not the
+    # replay, is the bottleneck of rate_shard (see benchmark()).
+    student_next = [0] * n_students
+    problem_next = [0] * n_problems
+    waves = []
+    for student, problem in zip(student_codes.tolist(), problem_codes.tolist()):
+        wave = max(student_next[student], problem_next[problem])
+        waves.append(wave)
+        student_next[student] = problem_next[problem] = wave + 1
+    return np.asarray(waves, dtype='int64')
+
+
+def replay(student_codes, problem_codes, correct, student_ratings, problem_ratings, waves, k=K_FACTOR):
+    student_ratings = student_ratings.copy()
+    problem_ratings = problem_ratings.copy()
+
+    order = np.argsort(waves, kind='stable')
+    students, problems, outcomes = student_codes[order], problem_codes[order], correct[order]
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+    for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(order)]])):
+        s, p = students[start:end], problems[start:end]
+        expected = 1.0 / (1.0 + 10.0 ** ((problem_ratings[p] - student_ratings[s]) / SCALE))
+        delta = k * (outcomes[start:end] - expected)
+        student_ratings[s] += delta
+        problem_ratings[p] -= delta
+    return student_ratings, problem_ratings
+
+
+def _accuracy_stats(codes, correct, n):
+    num_activities = np.bincount(codes, minlength=n)
+    accuracy = np.bincount(codes, weights=correct, minlength=n) / num_activities
+    # z-score with the sample standard deviation, as pandas' std()
+    std = accuracy.std(ddof=1) if n > 1 else 0.0
+    accuracy_scaled = (accuracy - accuracy.mean()) / std if std else np.zeros(n)
+    return num_activities, accuracy, accuracy_scaled
+
+
+def rate_shard(category, attempts):
+    # One category: problems belong to exactly one category, so shards never share a rating
+    student_codes, students = pd.factorize(attempts['uuid'])
+    problem_codes, problems = pd.factorize(attempts['upid'])
+    correct = attempts['is_correct'].to_numpy(dtype='float64')
+
+    student_activities, student_accuracy, student_scaled = _accuracy_stats(student_codes, correct, len(students))
+    problem_activities, problem_accuracy, problem_scaled = _accuracy_stats(problem_codes, correct, len(problems))
+    student_init = BASE_RATING + SCALE * student_scaled
+    problem_init = BASE_RATING - SCALE * problem_scaled
+
+    # final_init replays the log from the accuracy-based ratings; final_curr is a second pass
+    # starting from final_init
+    waves = assign_waves(student_codes, problem_codes, len(students), len(problems))
+    student_final, problem_final = replay(student_codes, problem_codes, correct, student_init, problem_init, waves)
+    student_curr, _ = replay(student_codes, problem_codes, correct, student_final, problem_final, waves)
+
+    df_uuid = pd.DataFrame({
+        'uuid': np.asarray(students, dtype=object), 'categories': category,
+        'num_activities': student_activities, 'accuracy': student_accuracy, 'accuracy_scaled': student_scaled,
+        'init_rating': student_init, 'final_init': student_final, 'final_curr': student_curr,
+    })
+    df_upid = pd.DataFrame({
+        'upid': np.asarray(problems, dtype=object), 'categories': category,
+        'num_activities': problem_activities, 'accuracy': problem_accuracy, 'accuracy_scaled': problem_scaled,
+        'init_rating': problem_init, 'final_init': problem_final,
+    })
+    return df_uuid, df_upid
+
+
+def rate_attempts(attempts, processes=None):
+    # `attempts` is time-ordered with uuid, upid, categories and is_correct columns
+    shards = [(category, attempts.loc[attempts['categories'] == category, ['uuid', 'upid', 'is_correct']])
+              for category in CATEGORIES]
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(rate_shard, *zip(*shards)))
+
+    df_uuid = pd.concat([df for df, _ in results], ignore_index=True)
+    df_upid = pd.concat([df for _, df in results], ignore_index=True)
+
+    # Every student gets a row per category; categories without attempts are all zeros
+    grid = pd.MultiIndex.from_product([attempts['uuid'].astype(str).unique(), CATEGORIES], names=['uuid', 'categories'])
+    df_uuid = df_uuid.set_index(['uuid', 'categories']).reindex(grid, fill_value=0).sort_index().reset_index()
+    df_uuid['num_activities'] = df_uuid['num_activities'].astype('int64')
+    df_uuid = df_uuid.astype({'uuid': 'category', 'categories': 'category'})
+    df_upid = df_upid.sort_values('upid', ignore_index=True).astype({'upid': 'category', 'categories': 'category'})
+    return df_uuid, df_upid
+
+
+def load_attempts(log_path=FILE_LOG_PROCESSED, content_path=FILE_CONTENT_PROCESSED):
+    df_log = pd.read_parquet(log_path, columns=ATTEMPT_COLUMNS)
+    df_content = pd.read_parquet(content_path, columns=['upid', 'categories'])
+    attempts = df_log.merge(df_content, on='upid', how='inner')
+    return attempts.sort_values('timestamp_TW', kind='stable', ignore_index=True)
+
+
+def synthetic_attempts(n_rows, n_students=70_000, n_problems=12_000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Log-normal popularity, so some students and problems are far more active than others
+    student_weights = rng.lognormal(sigma=1.0, size=n_students)
+    problem_weights = rng.lognormal(sigma=1.0, size=n_problems)
+    students = rng.choice(n_students, n_rows, p=student_weights / student_weights.sum())
+    problems = rng.choice(n_problems, n_rows, p=problem_weights / problem_weights.sum())
+    return pd.DataFrame({
+        'uuid': pd.Categorical.from_codes(students, [f'u{i}' for i in range(n_students)]),
+        'upid': pd.Categorical.from_codes(problems, [f'p{i}' for i in range(n_problems)]),
+        'categories': np.asarray(CATEGORIES)[problems % len(CATEGORIES)],
+        'is_correct': rng.random(n_rows) < 0.6,
+    })
+
+
+def benchmark(n_rows, processes=None):
+    attempts = synthetic_attempts(n_rows)
+    start = time.perf_counter()
+    rate_attempts(attempts, processes)
+    elapsed = time.perf_counter() - start
+    print(f'{n_rows:,} attempts in {elapsed:.1f}s: {n_rows / elapsed:,.0f} attempts/sec')
+
+    # Where one shard's time goes: the sequential wave pass against the two vectorized replays
+    shard = attempts[attempts['categories'] == CATEGORIES[0]]
+    student_codes, students = pd.factorize(shard['uuid'])
+    problem_codes, problems = pd.factorize(shard['upid'])
+    correct = shard['is_correct'].to_numpy(dtype='float64')
+    start = time.perf_counter()
+    waves = assign_waves(student_codes, problem_codes, len(students), len(problems))
+    wave_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(2):
+        replay(student_codes, problem_codes, correct, np.full(len(students), 1600.0),
+               np.full(len(problems), 1600.0), waves)
+    replay_seconds = time.perf_counter() - start
+    print(f'{CATEGORIES[0]} shard, {len(shard):,} attempts: wave assignment {wave_seconds:.2f}s (Python loop), '
+          f'2 replays {replay_seconds:.2f}s (NumPy)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay the attempt log and write student and problem Elo ratings.')
+    parser.add_argument('--log', default=FILE_LOG_PROCESSED)
+    parser.add_argument('--content', default=FILE_CONTENT_PROCESSED)
+    parser.add_argument('--uuid-output', default=FILE_UUID_RATING)
+    parser.add_argument('--upid-output', default=FILE_UPID_RATING)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help='rate a synthetic log of ROWS attempts and report throughput instead')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.processes)
+    else:
+        df_uuid, df_upid = rate_attempts(load_attempts(args.log, args.content), args.processes)
+        df_uuid.to_parquet(args.uuid_output, compression='gzip')
+        df_upid.to_parquet(args.upid_output, compression='gzip')
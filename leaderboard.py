@@ -0,0 +1,30 @@
+ALL_CITIES = 'All Cities'
+
+
+def _top_k_per_city(df_group, column, k):
+    # Stable sort keeps nlargest()'s first-occurrence tie order within each city
+    ranked = df_group.sort_values(column, ascending=False, kind='stable')
+    return ranked, ranked.groupby('user_city', observed=True, sort=False).head(k)
+
+
+def build_leaderboard_index(active_df, k=5):
+    # Students without an alias or city can't be ranked; dropping them first keeps the city list in
+    # step with the groups below
+    active_df = active_df.dropna(subset=['alias', 'user_city'])
+
+    # Group and aggregate data once for every student
+    df_group = active_df.groupby(['alias', 'user_city'], observed=True).agg(
+        attempt_count=('num_activities', 'sum'),
+        average_rating=('final_curr', 'mean')
+    ).reset_index()
+
+    ranked_rating, top_rating = _top_k_per_city(df_group, 'average_rating', k)
+    ranked_attempt, top_attempt = _top_k_per_city(df_group, 'attempt_count', k)
+
+    # City -> (top k by average rating, top k by attempt count), in selectbox order
+    index = {ALL_CITIES: (ranked_rating.head(k).reset_index(drop=True), ranked_attempt.head(k).reset_index(drop=True))}
+    rating_by_city = dict(tuple(top_rating.groupby('user_city', observed=True, sort=False)))
+    attempt_by_city = dict(tuple(top_attempt.groupby('user_city', observed=True, sort=False)))
+    for city in active_df['user_city'].unique().tolist():
+        index[city] = (rating_by_city[city].reset_index(drop=True), attempt_by_city[city].reset_index(drop=True))
+    return index
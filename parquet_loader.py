@@ -0,0 +1,88 @@
+import argparse
+import multiprocessing
+import os
+
+import pandas as pd
+
+# Text columns with few distinct values (or repeated keys) are held as categoricals
+CATEGORICAL_COLUMNS = ['uuid', 'upid', 'categories', 'user_city']
+
+
+def compact_dtypes(df):
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+        elif pd.api.types.is_integer_dtype(df[column].dtype):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def resident_memory():
+    # Current resident set size in bytes (Linux /proc), falling back to the peak RSS
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _load_and_measure(mode, sections):
+    # Modules are imported before the first reading, so only the loaded data counts in either mode
+    import pyarrow.parquet
+    from data_layer import source_projections
+    from shared_dataset import project, read_shared, shared_table
+
+    rss_before = resident_memory()
+    paths = sorted({path for path, _, _ in sections.values()})
+    if mode == 'full':
+        frames = [pd.read_parquet(path) for path in paths]
+        table_bytes = 0
+    else:
+        # What the dashboard holds: one shared Arrow table per file, plus each section's filtered frame
+        project(source_projections(sections))
+        frames = [read_shared(*spec) for spec in sections.values()]
+        table_bytes = sum(shared_table(path).nbytes for path in paths)
+    return rss_before, resident_memory(), sum(_frame_bytes(df) for df in frames), table_bytes
+
+
+def memory_report(sections):
+    # `sections` maps a section name to its (path, columns, filters) read. The dashboard reads through
+    # shared_dataset.read_shared, which filters an in-memory table: every session shares one copy of
+    # each file instead of each cache entry decoding its own row groups, and holds only the columns
+    # (and rows) the sections read from it.
+    from data_layer import source_projections
+    from shared_dataset import project, read_shared
+
+    project(source_projections(sections))
+
+    print(f"{'section':<18}{'full rows':>12}{'full MiB':>10}{'rows':>12}{'MiB':>10}")
+    for name, (path, columns, filters) in sections.items():
+        full = pd.read_parquet(path)
+        shared = read_shared(path, columns, filters)
+        print(f'{name:<18}{len(full):>12,}{_frame_bytes(full) / 2**20:>10.1f}'
+              f'{len(shared):>12,}{_frame_bytes(shared) / 2**20:>10.1f}')
+        del full, shared
+
+    # Resident memory is measured in a fresh interpreter per mode so allocator reuse doesn't skew it
+    context = multiprocessing.get_context('spawn')
+    for mode in ['full', 'shared']:
+        with context.Pool(1) as pool:
+            rss_before, rss_after, frame_bytes, table_bytes = pool.apply(_load_and_measure, (mode, sections))
+        print(f'{mode:<10} frames={frame_bytes / 2**20:8.1f} MiB tables={table_bytes / 2**20:8.1f} MiB '
+              f'rss_before={rss_before / 2**20:8.1f} MiB rss_after={rss_after / 2**20:8.1f} MiB '
+              f'delta={(rss_after - rss_before) / 2**20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    from data_layer import section_reads
+
+    parser = argparse.ArgumentParser(description='Compare resident memory of full loads and the dashboard shared-table reads.')
+    parser.add_argument('--min-activities', type=int, default=100)
+    args = parser.parse_args()
+
+    memory_report({name: spec for name, spec in section_reads(args.min_activities).items() if os.path.exists(spec[0])})
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cohorts import cohort_counts, period_index
+from sources import FILE_COHORT, FILE_TIME_PER_DAY, FILE_USER_ACTIVITY, FILE_UUID_RATING, file_fingerprint
+
+FILE_LOG_PROCESSED = 'Processed_Log_Problem.parquet.gzip'
+LOG_COLUMNS = ['uuid', 'timestamp_TW', 'total_sec_taken']
+
+# Checkpoint of the running accumulators, so new log partitions are folded in without a rebuild
+STATE_DIR = 'pipeline_state'
+
+# Compact the accumulated (uuid, day) pairs once this many rows have been appended
+PAIR_COMPACT_ROWS = 5_000_000
+
+
+def stream_log(path, batch_size=1_000_000):
+    # Yields the log one record batch at a time; only the columns the artifacts need are decoded
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=LOG_COLUMNS):
+        yield batch.to_pandas()
+
+
+def new_state():
+    return {
+        'day_sums': pd.Series(dtype='float64'),
+        'day_counts': pd.Series(dtype='int64'),
+        'user_days': pd.DataFrame({'uuid': pd.Series(dtype='object'), 'day': pd.Series(dtype='int64')}),
+        'compacted_rows': 0,
+    }
+
+
+def _local_timestamps(values):
+    timestamps = pd.to_datetime(values)
+    # Keep the Taiwan wall-clock time; dates and months are taken in local time
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps
+
+
+def accumulate_batch(state, df_batch):
+    timestamps = _local_timestamps(df_batch['timestamp_TW'])
+
+    # Running per-day sum and count of seconds taken
+    days = timestamps.to_numpy(dtype='datetime64[D]')
+    seconds = df_batch['total_sec_taken']
+    per_day = pd.DataFrame({'date': days, 'seconds': seconds}).groupby('date')['seconds'].agg(['sum', 'count'])
+    state['day_sums'] = state['day_sums'].add(per_day['sum'], fill_value=0)
+    state['day_counts'] = state['day_counts'].add(per_day['count'], fill_value=0).astype('int64')
+
+    # Distinct (uuid, day) pairs, days since 1970-01-01, for cohorts at any granularity. Every user
+    # is kept, so a user rated later still gets their earlier days; the rating filter is applied when
+    # the artifacts are written
+    pairs = pd.DataFrame({'uuid': df_batch['uuid'].astype(str).to_numpy(), 'day': days.astype('int64')})
+    pairs = pairs.drop_duplicates()
+    user_days = pd.concat([state['user_days'], pairs], ignore_index=True)
+    if len(user_days) > max(PAIR_COMPACT_ROWS, 2 * state['compacted_rows']):
+        user_days = user_days.drop_duplicates(ignore_index=True)
+        state['compacted_rows'] = len(user_days)
+    state['user_days'] = user_days
+    return state
+
+
+def finalize_time_per_day(state):
+    avg_time_per_day = pd.DataFrame({
+        'date': pd.to_datetime(state['day_sums'].index).date,
+        'total_sec_taken': (state['day_sums'] / state['day_counts']).to_numpy(),
+        'n_attempts': state['day_counts'].to_numpy(dtype='int64'),
+    })
+    return avg_time_per_day.sort_values('date', ignore_index=True)
+
+
+def finalize_user_activity(state, user_filter=None):
+    # The (uuid, day) pairs the dashboard builds daily, weekly and monthly cohorts from
+    user_days = state['user_days'].drop_duplicates(ignore_index=True)
+    if user_filter is not None:
+        user_days = user_days[user_days['uuid'].isin(user_filter)]
+    user_days = user_days.sort_values(['uuid', 'day'], ignore_index=True)
+    return pd.DataFrame({'uuid': user_days['uuid'].astype('category'), 'day': user_days['day'].astype('int32')})
+
+
+def finalize_cohort(state, user_filter=None):
+    return cohort_table(finalize_user_activity(state, user_filter))
+
+
+def cohort_table(user_activity):
+    # The monthly cohort table; each user's cohort is the month of their first activity
+    df_cohort = cohort_counts(user_activity['uuid'].cat.codes, user_activity['day'], 'monthly')
+
+    return pd.DataFrame({
+        'First_Mo': period_index(df_cohort['first'], 'monthly'),
+        'Order_Mo': period_index(df_cohort['order'], 'monthly'),
+        'n_customers': df_cohort['n_customers'].astype('int64'),
+        'period_number': (df_cohort['order'] - df_cohort['first']).astype('int64'),
+    })
+
+
+def save_state(state, processed, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    days = pd.DataFrame({'sum': state['day_sums'], 'count': state['day_counts']})
+    days.index = pd.to_datetime(days.index).rename('date')
+    _replace_parquet(days, os.path.join(state_dir, 'days.parquet'))
+    user_days = state['user_days'].drop_duplicates(ignore_index=True)
+    _replace_parquet(user_days.astype({'uuid': 'category'}), os.path.join(state_dir, 'user_days.parquet'))
+    with open(os.path.join(state_dir, 'processed.json'), 'w') as manifest:
+        json.dump(processed, manifest, indent=2)
+
+
+def load_state(state_dir=STATE_DIR):
+    # A missing checkpoint is an empty state with no processed partitions
+    if not os.path.exists(os.path.join(state_dir, 'processed.json')):
+        return new_state(), {}
+    state = new_state()
+    days = pd.read_parquet(os.path.join(state_dir, 'days.parquet'))
+    state['day_sums'] = days['sum'].set_axis(days.index.to_numpy(dtype='datetime64[D]'))
+    state['day_counts'] = days['count'].astype('int64').set_axis(days.index.to_numpy(dtype='datetime64[D]'))
+    user_days = pd.read_parquet(os.path.join(state_dir, 'user_days.parquet'))
+    state['user_days'] = user_days.astype({'uuid': 'object', 'day': 'int64'})
+    state['compacted_rows'] = len(user_days)
+    with open(os.path.join(state_dir, 'processed.json')) as manifest:
+        processed = json.load(manifest)
+    return state, processed
+
+
+def _replace_parquet(df, path):
+    # Write next to the target and swap it in, so readers never see a half-written file
+    tmp_path = f'{path}.tmp'
+    df.to_parquet(tmp_path, compression='gzip')
+    os.replace(tmp_path, path)
+
+
+def write_artifacts(state, rating_path=FILE_UUID_RATING, time_per_day_path=FILE_TIME_PER_DAY,
+                    cohort_path=FILE_COHORT, user_activity_path=FILE_USER_ACTIVITY):
+    # Cohorts only cover users that have a rating
+    rating_users = pd.read_parquet(rating_path, columns=['uuid'])['uuid'].astype(str).unique()
+    _replace_parquet(finalize_time_per_day(state), time_per_day_path)
+    user_activity = finalize_user_activity(state, rating_users)
+    _replace_parquet(cohort_table(user_activity), cohort_path)
+    _replace_parquet(user_activity, user_activity_path)
+
+
+def update(log_paths, rating_path=FILE_UUID_RATING, time_per_day_path=FILE_TIME_PER_DAY, cohort_path=FILE_COHORT,
+           state_dir=STATE_DIR, batch_size=1_000_000, user_activity_path=FILE_USER_ACTIVITY):
+    # Folds log partitions that are not in the checkpoint yet into the artifacts
+    state, processed = load_state(state_dir)
+    new_partitions = 0
+    for log_path in log_paths:
+        (_, mtime_ns, size), = file_fingerprint(log_path)
+        key = os.path.abspath(log_path)
+        if key in processed:
+            if processed[key] != [mtime_ns, size]:
+                raise ValueError(f"{log_path} changed since it was folded into the checkpoint; run a full build")
+            continue
+        for df_batch in stream_log(log_path, batch_size):
+            accumulate_batch(state, df_batch)
+        processed[key] = [mtime_ns, size]
+        new_partitions += 1
+
+    if new_partitions:
+        write_artifacts(state, rating_path, time_per_day_path, cohort_path, user_activity_path)
+        save_state(state, processed, state_dir)
+    return new_partitions
+
+
+def build(log_paths, rating_path=FILE_UUID_RATING, time_per_day_path=FILE_TIME_PER_DAY, cohort_path=FILE_COHORT,
+          state_dir=STATE_DIR, batch_size=1_000_000, user_activity_path=FILE_USER_ACTIVITY):
+    # Full rebuild: drop the checkpoint and fold every partition from scratch
+    for name in ['processed.json', 'days.parquet', 'user_days.parquet']:
+        if os.path.exists(os.path.join(state_dir, name)):
+            os.remove(os.path.join(state_dir, name))
+    return update(log_paths, rating_path, time_per_day_path, cohort_path, state_dir, batch_size, user_activity_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Build time_per_day, cohort and user activity artifacts from the Junyi problem log.')
+    parser.add_argument('mode', choices=['build', 'update'],
+                        help='build rebuilds from scratch; update folds in only partitions not seen before')
+    parser.add_argument('logs', nargs='*', default=[FILE_LOG_PROCESSED], help='log parquet partitions')
+    parser.add_argument('--ratings', default=FILE_UUID_RATING)
+    parser.add_argument('--time-per-day', default=FILE_TIME_PER_DAY)
+    parser.add_argument('--cohort', default=FILE_COHORT)
+    parser.add_argument('--user-activity', default=FILE_USER_ACTIVITY)
+    parser.add_argument('--state-dir', default=STATE_DIR)
+    parser.add_argument('--batch-size', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    run = build if args.mode == 'build' else update
+    new_partitions = run(args.logs, args.ratings, args.time_per_day, args.cohort, args.state_dir, args.batch_size,
+                         args.user_activity)
+    print(f'{new_partitions} new log partition(s) folded in')
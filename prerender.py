@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+
+import views
+from data_layer import cache_data
+from profiling import span
+from sources import CATEGORIES, file_fingerprint
+
+# `python prerender.py` renders every section, city and the full date window ahead of time into
+# DASHBOARD_PRERENDER_DIR. The dashboard serves a pre-rendered view while its sources and the chart
+# code are unchanged, and builds anything else (custom date ranges, other heatmap tiles) live.
+PRERENDER_DIR = os.environ.get('DASHBOARD_PRERENDER_DIR', 'prerendered')
+MANIFEST = 'manifest.json'
+
+
+# Modules whose code decides what a view shows: the figures themselves and every aggregation behind them
+CHART_MODULES = ['views.py', 'data_layer.py', 'duckdb_backend.py', 'accuracy_bins.py', 'date_range_index.py',
+                 'leaderboard.py', 'cohorts.py']
+
+# Figure files this tool writes: <16 hex digits>-<figure name>.json or .html
+FIGURE_FILE = re.compile(r'[0-9a-f]{16}-\w+\.(json|html)')
+
+
+def _chart_version():
+    # Views rendered by a different version of the chart code are out of date too
+    digest = hashlib.sha1()
+    for module in CHART_MODULES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(views.__file__)), module), 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+CHART_VERSION = _chart_version()
+
+
+def view_sources(key):
+    section, _, rest = key.partition('/')
+    if section == 'accuracy':
+        return views.VIEW_SOURCES[f"accuracy/{rest.split('/')[0]}"]
+    if section == 'retention':
+        return views.VIEW_SOURCES['retention/cohort' if rest == 'cohort' else 'retention/activity']
+    return views.VIEW_SOURCES[section]
+
+
+def build_view(key):
+    section, _, rest = key.partition('/')
+    if section == 'demographics':
+        return views.demographics_view()
+    if section == 'accuracy':
+        source, category = rest.split('/', 1)
+        return views.accuracy_view(source, category)
+    if section == 'engagement':
+        return views.engagement_view()
+    if section == 'leaderboard':
+        return views.leaderboard_view(rest)
+    if section == 'retention':
+        return views.retention_view(None if rest == 'cohort' else rest)
+    raise ValueError(f"Unknown view: {key!r}")
+
+
+def view_fingerprint(key):
+    # Source files and the chart code, as lists so it compares equal to the manifest's copy
+    return [CHART_VERSION] + [list(entry) for entry in file_fingerprint(*view_sources(key))]
+
+
+def view_keys():
+    # Every view the dashboard opens with, skipping those whose sources are missing
+    keys = ['demographics', 'engagement']
+    keys += [f'accuracy/{source}/{category}' for source in ['student', 'problem'] for category in CATEGORIES]
+    keys += ['leaderboard/'] + ['retention/cohort'] + [f'retention/{granularity}' for granularity in views.COHORT_PERIODS]
+    keys = [key for key in keys if all(os.path.exists(path) for path in view_sources(key))]
+    if 'leaderboard/' in keys:
+        index = keys.index('leaderboard/')
+        keys[index:index + 1] = [f'leaderboard/{city}' for city in views.leaderboard_view()['meta']['cities']]
+    return keys
+
+
+def _write_text(path, text):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as out:
+        out.write(text)
+    os.replace(tmp_path, path)
+
+
+def _quiet():
+    # Workers use st.cache_data without a running app; don't log that for every call
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+
+
+def render_view(key, output=PRERENDER_DIR, html=False):
+    fingerprint = view_fingerprint(key)
+    view = build_view(key)
+
+    # Files are named after the view and its sources, so a new render never overwrites a file the
+    # current manifest points at
+    digest = hashlib.sha1(json.dumps([key, fingerprint]).encode()).hexdigest()[:16]
+    figures = {}
+    for name, fig in view['figures'].items():
+        figures[name] = f'{digest}-{name}.json'
+        _write_text(os.path.join(output, figures[name]), fig.to_json())
+        if html:
+            fig.write_html(os.path.join(output, f'{digest}-{name}.html'), include_plotlyjs='cdn')
+    return key, {'sources': fingerprint, 'figures': figures, 'meta': view['meta']}
+
+
+def render_all(output=PRERENDER_DIR, processes=None, html=False):
+    # One view per task on a process pool; each worker loads the sources once and keeps its own caches
+    _quiet()
+    os.makedirs(output, exist_ok=True)
+    keys = view_keys()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_quiet) as pool:
+        entries = dict(pool.map(render_view, keys, [output] * len(keys), [html] * len(keys)))
+    _write_text(os.path.join(output, MANIFEST), json.dumps({'views': entries}, indent=2))
+
+    # Drop the figures of earlier renders; nothing else in `output` is touched
+    keep = {file for entry in entries.values() for file in entry['figures'].values()}
+    keep |= {file.replace('.json', '.html') for file in keep}
+    for file in os.listdir(output):
+        if FIGURE_FILE.fullmatch(file) and file not in keep:
+            os.remove(os.path.join(output, file))
+    return entries
+
+
+@cache_data
+def load_manifest(fingerprint):
+    (path, _, _), = fingerprint
+    with open(path) as manifest:
+        return json.load(manifest)['views']
+
+
+@cache_data
+def load_figure_json(path):
+    with open(path) as figure:
+        return figure.read()
+
+
+def prerendered_view(key, output=PRERENDER_DIR):
+    # {'figures', 'meta'} like the views module builds, or None if `key` has not been rendered or
+    # any of its sources changed since
+    with span('prerendered') as record:
+        try:
+            entry = load_manifest(file_fingerprint(os.path.join(output, MANIFEST))).get(key)
+            if entry is None or entry['sources'] != view_fingerprint(key):
+                return None
+            figures = {name: pio.from_json(load_figure_json(os.path.join(output, file)))
+                       for name, file in entry['figures'].items()}
+        except OSError:
+            return None
+        record['rows'] = len(figures)
+    return {'figures': figures, 'meta': entry['meta']}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-render every dashboard view to static figure files.')
+    parser.add_argument('--output', default=PRERENDER_DIR)
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--html', action='store_true', help='also write a standalone HTML page per figure')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = render_all(args.output, args.processes, args.html)
+    figures = sum(len(entry['figures']) for entry in entries.values())
+    print(f'{len(entries)} views, {figures} figures written to {args.output} in {time.perf_counter() - start:.1f}s')
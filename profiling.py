@@ -0,0 +1,154 @@
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# DASHBOARD_PROFILE=0 turns instrumentation off; DASHBOARD_PROFILE_FILE appends one JSON line per
+# section run, or keeps Prometheus text-format gauges when the name ends in '.prom'
+ENABLED = os.environ.get('DASHBOARD_PROFILE', '1') != '0'
+PROFILE_FILE = os.environ.get('DASHBOARD_PROFILE_FILE')
+
+_stack = contextvars.ContextVar('profile_stack', default=())
+_latest = {}
+_file_lock = threading.Lock()
+
+
+def _new_record(name):
+    return {'name': name, 'wall_ms': 0.0, 'rows': 0, 'cache_hits': 0, 'cache_misses': 0, 'figure_bytes': 0,
+            'children': []}
+
+
+@contextlib.contextmanager
+def span(name):
+    if not ENABLED:
+        yield _new_record(name)
+        return
+
+    record = _new_record(name)
+    token = _stack.set(_stack.get() + (record,))
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        _stack.reset(token)
+        parents = _stack.get()
+        if parents:
+            parents[-1]['children'].append(record)
+        else:
+            _publish(record)
+
+
+def section(name):
+    # Profiles every run of a dashboard section, including fragment reruns
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return run
+    return decorate
+
+
+def cache_data(func=None, **cache_kwargs):
+    # st.cache_data that also records cache hits/misses and result rows on the enclosing span
+    def decorate(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            # Only runs on a cache miss
+            parents = _stack.get()
+            if parents:
+                parents[-1]['cache_misses'] += 1
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(compute)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            with span(func.__name__) as record:
+                result = cached(*args, **kwargs)
+                if not record['cache_misses']:
+                    record['cache_hits'] += 1
+                if hasattr(result, 'shape'):
+                    record['rows'] = len(result)
+                return result
+        lookup.clear = cached.clear
+        return lookup
+
+    return decorate(func) if func is not None else decorate
+
+
+def plotly_chart(fig, **kwargs):
+    with span('plotly_chart') as record:
+        if ENABLED:
+            record['figure_bytes'] = len(fig.to_json())
+        st.plotly_chart(fig, **kwargs)
+
+
+def _totals(record):
+    # Roll child counters up into the section record; self_ms is the time not spent in any child
+    # (figure construction, layout, markdown)
+    for child in record['children']:
+        _totals(child)
+        for key in ['rows', 'cache_hits', 'cache_misses', 'figure_bytes']:
+            record[key] += child[key]
+    record['self_ms'] = round(record['wall_ms'] - sum(child['wall_ms'] for child in record['children']), 3)
+    return record
+
+
+def _flatten(record, depth=0):
+    yield {'span': '  ' * depth + record['name'],
+           **{k: v for k, v in record.items() if k not in ('name', 'children', 'timestamp')}}
+    for child in record['children']:
+        yield from _flatten(child, depth + 1)
+
+
+def _publish(record):
+    _totals(record)
+    record['timestamp'] = datetime.datetime.now().isoformat(timespec='milliseconds')
+    _latest[record['name']] = record
+    if get_script_run_ctx() is not None:
+        st.session_state.setdefault('_profile', {})[record['name']] = record
+    if PROFILE_FILE:
+        _write_profile(record)
+
+
+def _write_profile(record):
+    with _file_lock:
+        if PROFILE_FILE.endswith('.prom'):
+            lines = []
+            for metric, key, help_text in [
+                    ('dashboard_section_wall_seconds', 'wall_ms', 'Wall time of the last run of a section'),
+                    ('dashboard_section_rows', 'rows', 'Rows processed by the data functions of a section'),
+                    ('dashboard_section_cache_hits', 'cache_hits', 'Cache hits in the last run of a section'),
+                    ('dashboard_section_cache_misses', 'cache_misses', 'Cache misses in the last run of a section'),
+                    ('dashboard_section_figure_bytes', 'figure_bytes', 'Figure JSON bytes sent by a section')]:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} gauge')
+                for name, latest in sorted(_latest.items()):
+                    value = round(latest[key] / 1000, 6) if key == 'wall_ms' else latest[key]
+                    lines.append(f'{metric}{{section="{name}"}} {value}')
+            tmp_path = f'{PROFILE_FILE}.tmp'
+            with open(tmp_path, 'w') as prom:
+                prom.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, PROFILE_FILE)
+        else:
+            with open(PROFILE_FILE, 'a') as jsonl:
+                jsonl.write(json.dumps(record) + '\n')
+
+
+def debug_panel():
+    # Hidden unless the page is opened with ?debug=1
+    if st.query_params.get('debug') != '1':
+        return
+    with st.expander('Profiling', expanded=True):
+        profile = st.session_state.get('_profile', {})
+        rows = [row for record in profile.values() for row in _flatten(record)]
+        st.dataframe(rows, use_container_width=True)
@@ -0,0 +1,212 @@
+import contextvars
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow.parquet as pq
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from arrow_format import pick_format, read_table
+from parquet_loader import compact_dtypes
+from profiling import span
+from sources import SOURCE_FILES, file_fingerprint
+
+# DASHBOARD_CACHE_BYTES bounds the Arrow tables kept resident (least recently used go first),
+# DASHBOARD_CACHE_TTL drops tables idle for that many seconds (0 keeps them), and
+# DASHBOARD_REFRESH_SECONDS is how often the source files are checked for a new version (0 never)
+CACHE_BYTES = int(float(os.environ.get('DASHBOARD_CACHE_BYTES', 4 * 2**30)))
+CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 0)) or None
+REFRESH_SECONDS = float(os.environ.get('DASHBOARD_REFRESH_SECONDS', 30))
+
+# One immutable Arrow table per file version for the whole process, shared by every session. Reads run
+# on a thread pool (pyarrow releases the GIL while decoding), so all sources load at once.
+_executor = ThreadPoolExecutor(max_workers=len(SOURCE_FILES), thread_name_prefix='dataset-loader')
+_lock = threading.RLock()
+# fingerprint -> {'path', 'format', 'future', 'bytes', 'used'}, least recently used first
+_versions = OrderedDict()
+# path -> fingerprint of the version sessions read
+_published = {}
+# path -> fingerprint of a new version while it is being pre-warmed, in the refresh thread only
+_warming = contextvars.ContextVar('warming_versions', default={})
+_warm = None
+_watcher = None
+# path -> (columns, filters) its tables are loaded with; paths not listed are loaded whole
+_projections = {}
+
+
+def _start(fingerprint, path, fmt, file):
+    # Called with _lock held
+    if fingerprint not in _versions:
+        columns, filters = _projections.get(path, (None, None))
+        version = {'path': path, 'format': fmt, 'future': _executor.submit(read_table, file, fmt, columns, filters),
+                   'bytes': 0, 'used': time.monotonic()}
+        _versions[fingerprint] = version
+        version['future'].add_done_callback(lambda future: _loaded(fingerprint, future))
+    return _versions[fingerprint]
+
+
+def _loaded(fingerprint, future):
+    with _lock:
+        if fingerprint in _versions and future.exception() is None:
+            _versions[fingerprint]['bytes'] = future.result().nbytes
+        _evict()
+
+
+def _evict():
+    # Drop failed reads, versions idle past the TTL, then the least recently used ones until the
+    # byte budget holds. Sessions still holding a dropped table keep it until they finish; the next
+    # read of a dropped published version loads it again.
+    now = time.monotonic()
+    with _lock:
+        for fingerprint in [fingerprint for fingerprint, version in _versions.items()
+                            if version['future'].done() and version['future'].exception() is not None]:
+            del _versions[fingerprint]
+        done = [fingerprint for fingerprint, version in _versions.items() if version['future'].done()]
+        total = sum(_versions[fingerprint]['bytes'] for fingerprint in done)
+        for fingerprint in done:
+            if total <= CACHE_BYTES and (CACHE_TTL is None or now - _versions[fingerprint]['used'] < CACHE_TTL):
+                continue
+            total -= _versions.pop(fingerprint)['bytes']
+
+
+def _version(path):
+    # (fingerprint, version) sessions read `path` from. Raises OSError when the file is missing.
+    warming = _warming.get()
+    with _lock:
+        fingerprint = warming.get(path) or _published.get(path)
+        if fingerprint not in _versions:
+            # First use, or evicted: serve whatever is on disk now
+            fmt, file = pick_format(path)
+            fingerprint = file_fingerprint(file)
+            _start(fingerprint, path, fmt, file)
+            if path not in warming:
+                _published[path] = fingerprint
+        version = _versions[fingerprint]
+        version['used'] = time.monotonic()
+        _versions.move_to_end(fingerprint)
+        return fingerprint, version
+
+
+def project(projections):
+    # `projections` maps a path to the (columns, filters) every reader of it needs together; set
+    # before the first read, so columns and rows nobody reads are never loaded
+    with _lock:
+        _projections.update(projections)
+
+
+def current_fingerprint(path):
+    # Cache key of the version of `path` sessions currently read
+    return _version(path)[0]
+
+
+def refresh(paths=SOURCE_FILES):
+    # Reads changed files in the background and swaps them in only once they are loaded and the
+    # warm-up has filled the derived caches, so no session waits on the new version
+    changed = {}
+    with _lock:
+        for path in paths:
+            if path not in _published:
+                continue
+            try:
+                fmt, file = pick_format(path)
+                fingerprint = file_fingerprint(file)
+            except OSError:
+                # A file being replaced keeps serving its last version
+                continue
+            if fingerprint != _published[path]:
+                changed[path] = fingerprint
+                _start(fingerprint, path, fmt, file)
+
+    for path, fingerprint in list(changed.items()):
+        with _lock:
+            version = _versions.get(fingerprint)
+        # A version that failed to read, or was evicted before it could be published, is tried
+        # again on the next check
+        if version is None or version['future'].exception() is not None:
+            with _lock:
+                _versions.pop(fingerprint, None)
+            del changed[path]
+    if not changed:
+        return changed
+
+    token = _warming.set(changed)
+    try:
+        if _warm is not None:
+            with span('warm'):
+                _warm()
+    except Exception:
+        traceback.print_exc()
+    finally:
+        _warming.reset(token)
+    with _lock:
+        # Superseded versions can't be asked for again; sessions mid-run keep their own reference
+        for path, fingerprint in changed.items():
+            _versions.pop(_published[path], None)
+            _published[path] = fingerprint
+    _evict()
+    return changed
+
+
+def _watch():
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        # An error in one check must not stop the watcher for the life of the process
+        try:
+            refresh()
+            _evict()
+        except Exception:
+            traceback.print_exc()
+
+
+def preload(paths=SOURCE_FILES, warm=None):
+    # Start every read without waiting, and the watcher that picks up new file versions; `warm`
+    # is called for every new version before it is published. Missing files are reported by wait_for.
+    global _warm, _watcher
+    _warm = warm
+    for path in paths:
+        try:
+            _version(path)
+        except OSError:
+            pass
+    with _lock:
+        if _watcher is None and REFRESH_SECONDS > 0:
+            # Runs with the starting session's context, as the warm-up goes through st.cache_data
+            _watcher = add_script_run_ctx(threading.Thread(target=_watch, name='dataset-watcher', daemon=True))
+            _watcher.start()
+
+
+def wait_for(paths):
+    # Blocks until `paths` are loaded and returns the (path, error) pairs that could not be read
+    failed = []
+    for path in paths:
+        try:
+            _version(path)[1]['future'].result()
+        except Exception as error:
+            failed.append((path, error))
+    return failed
+
+
+def shared_table(path):
+    with span('shared_table') as record:
+        _, version = _version(path)
+        table = version['future'].result()
+        record['rows'] = table.num_rows
+        record['format'] = version['format']
+    return table
+
+
+def read_shared(path, columns=None, filters=None):
+    # Filter and project the shared table; column selection is zero-copy and only the
+    # matching rows of the requested columns are converted to pandas
+    table = shared_table(path)
+    if filters:
+        table = table.filter(pq.filters_to_expression(list(filters)))
+    if columns is not None:
+        table = table.select(list(columns))
+    with span('to_pandas') as record:
+        df = table.to_pandas()
+        record['rows'] = len(df)
+    return compact_dtypes(df)
@@ -0,0 +1,22 @@
+import os
+
+# Source files read by the dashboard
+FILE_UUID_RATING = 'final_uuid_rating.parquet.gzip'
+FILE_USERDATA = 'UserData_named_ID_EN.parquet.gzip'
+FILE_UPID_RATING = 'final_upid_rating.parquet.gzip'
+FILE_TIME_PER_DAY = 'time_per_day.parquet.gzip'
+FILE_COHORT = 'cohort.parquet.gzip'
+# Distinct (uuid, day) activity pairs written by pipeline.py; optional
+FILE_USER_ACTIVITY = 'user_activity.parquet.gzip'
+SOURCE_FILES = [FILE_UUID_RATING, FILE_USERDATA, FILE_UPID_RATING, FILE_TIME_PER_DAY, FILE_COHORT, FILE_USER_ACTIVITY]
+
+CATEGORIES = ['Arithmetic', 'Geometry', 'Algebra']
+
+
+def file_fingerprint(*paths):
+    # (path, mtime, size) per source file; rewriting any file changes the cache key
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
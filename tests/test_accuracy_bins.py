@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from accuracy_bins import bin_summary
+
+
+def test_matches_numpy_histogram_and_pandas_statistics():
+    rng = np.random.default_rng(0)
+    values = rng.beta(2, 3, size=5_000)
+    summary = bin_summary(values, nbins=50)
+
+    counts, edges = np.histogram(values, bins=50)
+    np.testing.assert_array_equal(summary['counts'], counts)
+    np.testing.assert_allclose(summary['edges'], edges)
+    series = pd.Series(values)
+    assert summary['count'] == len(values)
+    assert np.isclose(summary['mean'], series.mean())
+    assert np.isclose(summary['median'], series.median())
+    assert np.isclose(summary['q1'], series.quantile(0.25))
+    assert np.isclose(summary['q3'], series.quantile(0.75))
+
+
+def test_maximum_falls_in_last_bin_and_nans_are_dropped():
+    summary = bin_summary([0.0, 0.5, 1.0, np.nan], nbins=4)
+    np.testing.assert_array_equal(summary['counts'], [1, 0, 1, 1])
+    assert summary['count'] == 3
+
+
+def test_constant_and_empty_input():
+    constant = bin_summary([0.3] * 10, nbins=5)
+    assert constant['counts'].sum() == 10 and constant['median'] == 0.3
+    empty = bin_summary([], nbins=5)
+    assert empty['count'] == 0 and len(empty['counts']) == 0 and np.isnan(empty['mean'])
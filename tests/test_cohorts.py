@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohorts import GRANULARITIES, cohort_counts, period_codes, period_index, retention_table
+
+
+def _activity(n_pairs=20_000, n_users=500, seed=0):
+    rng = np.random.default_rng(seed)
+    # Days from 2018-07-15 to 2019-08-15, crossing month, week and year boundaries
+    first_day = (pd.Timestamp('2018-07-15') - pd.Timestamp('1970-01-01')).days
+    return pd.DataFrame({'user': rng.integers(0, n_users, n_pairs),
+                         'day': rng.integers(first_day, first_day + 397, n_pairs)})
+
+
+@pytest.mark.parametrize('granularity', list(GRANULARITIES))
+def test_period_codes_are_pandas_period_ordinals(granularity):
+    days = np.arange(-400, 20_000, 7 if granularity == 'daily' else 1)
+    dates = pd.to_datetime(days, unit='D')
+    expected = dates.to_period(GRANULARITIES[granularity]).asi8
+    np.testing.assert_array_equal(period_codes(days, granularity), expected)
+    assert list(period_index(period_codes(days[:5], granularity), granularity)) == list(
+        dates[:5].to_period(GRANULARITIES[granularity]))
+
+
+@pytest.mark.parametrize('granularity', list(GRANULARITIES))
+def test_cohort_counts_match_a_pandas_groupby(granularity):
+    df = _activity()
+    periods = pd.to_datetime(df['day'], unit='D').dt.to_period(GRANULARITIES[granularity])
+    df = df.assign(order=periods, first=periods.groupby(df['user']).transform('min'))
+    expected = (df.groupby(['first', 'order'])['user'].nunique().reset_index(name='n_customers'))
+
+    counts = cohort_counts(df['user'], df['day'], granularity)
+    assert list(counts['first']) == [period.ordinal for period in expected['first']]
+    assert list(counts['order']) == [period.ordinal for period in expected['order']]
+    assert list(counts['n_customers']) == list(expected['n_customers'])
+
+
+def test_retention_table_starts_at_100_percent():
+    df = _activity(seed=1)
+    table = retention_table(cohort_counts(df['user'], df['day'], 'weekly'), 'weekly')
+    assert (table[0] == 100).all()
+    assert table.index.freqstr == 'W-SUN'
+    assert (table.fillna(0) <= 100).all().all()
+
+
+def test_unknown_granularity_and_empty_input():
+    with pytest.raises(ValueError):
+        period_codes([0], 'hourly')
+    assert cohort_counts([], [], 'daily').empty
@@ -0,0 +1,55 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from date_range_index import build_range_index, downsample_frame, lttb_indices, query_range
+
+
+def _daily_frame(n_days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = [datetime.date(2018, 8, 1) + datetime.timedelta(days=day) for day in range(n_days)]
+    return pd.DataFrame({'date': dates, 'value': rng.integers(0, 100, n_days).astype('float64'),
+                         'weight': rng.integers(1, 10, n_days)})
+
+
+def test_query_range_matches_a_filter():
+    df = _daily_frame()
+    index = build_range_index(df.sample(frac=1, random_state=0), 'date', 'value')
+    weighted = build_range_index(df, 'date', 'value', 'weight')
+    for start, end in [(0, 119), (10, 40), (55, 55), (100, 140), (-5, 3)]:
+        start_date = datetime.date(2018, 8, 1) + datetime.timedelta(days=start)
+        end_date = datetime.date(2018, 8, 1) + datetime.timedelta(days=end)
+        window = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+
+        result = query_range(index, start_date, end_date)
+        assert result['total'] == window['value'].sum()
+        assert list(result['frame']['date']) == list(window['date'])
+
+        result = query_range(weighted, start_date, end_date)
+        expected = (window['value'] * window['weight']).sum() / window['weight'].sum()
+        assert np.isclose(result['mean'], expected)
+
+
+def test_empty_window():
+    index = build_range_index(_daily_frame(), 'date', 'value')
+    result = query_range(index, datetime.date(2020, 1, 1), datetime.date(2020, 2, 1))
+    assert result['total'] == 0 and len(result['frame']) == 0 and np.isnan(result['mean'])
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+    selected = lttb_indices(x, y, 200)
+    assert len(selected) == 200
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+    assert np.all(np.diff(selected) > 0)
+    assert 4321 in selected
+
+
+def test_lttb_and_downsample_leave_short_series_alone():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), np.arange(10), 50), np.arange(10))
+    df = _daily_frame(30)
+    assert downsample_frame(df, 'date', 'value', 100) is df
+    assert len(downsample_frame(_daily_frame(500), 'date', 'value', 100)) == 100
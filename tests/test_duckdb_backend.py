@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sources import CATEGORIES, FILE_COHORT, FILE_UPID_RATING, FILE_USERDATA, FILE_UUID_RATING
+
+duckdb_backend = pytest.importorskip('duckdb_backend')
+
+
+@pytest.fixture
+def source_files(tmp_path, monkeypatch):
+    # Small rating, user, problem and cohort files with missing city, alias and login date values
+    rng = np.random.default_rng(0)
+    n_users = 120
+    uuids = [f'user{i:03d}' for i in range(n_users)]
+    cities = np.array(['tp', 'ntpc', 'kl', 'tc'], dtype=object)[rng.integers(0, 4, n_users)]
+    login_dates = pd.Timestamp('2018-08-01') + pd.to_timedelta(rng.integers(0, 60, n_users), unit='D')
+    userdata = pd.DataFrame({
+        'uuid': uuids,
+        'user_city': np.where(rng.random(n_users) < 0.1, None, cities),
+        'first_login_date_TW': np.where(rng.random(n_users) < 0.1, None, login_dates.astype(str)),
+        'alias': np.where(rng.random(n_users) < 0.1, None, [f'student_{i}' for i in range(n_users)]),
+    })
+    # Every student of 'kl' without an alias, so a whole city drops out of the leaderboard
+    userdata.loc[userdata['user_city'] == 'kl', 'alias'] = None
+
+    ratings = pd.DataFrame({
+        'uuid': np.repeat(uuids, len(CATEGORIES)),
+        'categories': CATEGORIES * n_users,
+        'num_activities': rng.integers(0, 400, n_users * len(CATEGORIES)),
+        'accuracy': np.where(rng.random(n_users * len(CATEGORIES)) < 0.2, 0.0,
+                             rng.random(n_users * len(CATEGORIES))),
+        'final_curr': np.where(rng.random(n_users * len(CATEGORIES)) < 0.2, 0.0,
+                               1600 + 400 * rng.standard_normal(n_users * len(CATEGORIES))),
+    }).astype({'uuid': 'category', 'categories': 'category'})
+    problems = pd.DataFrame({
+        'upid': [f'problem{i:03d}' for i in range(90)],
+        'categories': CATEGORIES * 30,
+        'accuracy': np.where(rng.random(90) < 0.2, 0.0, rng.random(90)),
+    }).astype({'upid': 'category', 'categories': 'category'})
+    first = pd.PeriodIndex(['2018-08'] * 3 + ['2018-09'] * 2, freq='M')
+    order = pd.PeriodIndex(['2018-08', '2018-09', '2018-10', '2018-09', '2018-10'], freq='M')
+    cohort = pd.DataFrame({'First_Mo': first, 'Order_Mo': order, 'n_customers': [50, 20, 10, 40, 15],
+                           'period_number': [0, 1, 2, 0, 1]})
+
+    monkeypatch.chdir(tmp_path)
+    userdata.to_parquet(FILE_USERDATA, compression='gzip')
+    ratings.to_parquet(FILE_UUID_RATING, compression='gzip')
+    problems.to_parquet(FILE_UPID_RATING, compression='gzip')
+    cohort.to_parquet(FILE_COHORT, compression='gzip')
+
+
+def test_duckdb_agrees_with_pandas_on_missing_keys(source_files):
+    assert duckdb_backend.check_against_pandas() == []
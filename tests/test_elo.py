@@ -0,0 +1,54 @@
+import numpy as np
+
+from elo import K_FACTOR, SCALE, assign_waves, replay
+
+
+def _sequential(student_codes, problem_codes, correct, student_ratings, problem_ratings, k=K_FACTOR):
+    # Reference: one Elo update per attempt, in log order
+    student_ratings = student_ratings.copy()
+    problem_ratings = problem_ratings.copy()
+    for s, p, outcome in zip(student_codes, problem_codes, correct):
+        expected = 1.0 / (1.0 + 10.0 ** ((problem_ratings[p] - student_ratings[s]) / SCALE))
+        delta = k * (outcome - expected)
+        student_ratings[s] += delta
+        problem_ratings[p] -= delta
+    return student_ratings, problem_ratings
+
+
+def _attempts(n_attempts, n_students, n_problems, seed):
+    rng = np.random.default_rng(seed)
+    student_codes = rng.integers(0, n_students, n_attempts)
+    problem_codes = rng.integers(0, n_problems, n_attempts)
+    correct = rng.integers(0, 2, n_attempts).astype('float64')
+    student_ratings = 1600 + 400 * rng.standard_normal(n_students)
+    problem_ratings = 1600 + 400 * rng.standard_normal(n_problems)
+    return student_codes, problem_codes, correct, student_ratings, problem_ratings
+
+
+def test_waves_touch_each_student_and_problem_once():
+    student_codes, problem_codes, _, _, _ = _attempts(5_000, 300, 80, seed=1)
+    waves = assign_waves(student_codes, problem_codes, 300, 80)
+    for wave in np.unique(waves):
+        in_wave = waves == wave
+        assert len(np.unique(student_codes[in_wave])) == in_wave.sum()
+        assert len(np.unique(problem_codes[in_wave])) == in_wave.sum()
+
+
+def test_wave_replay_equals_sequential_replay():
+    for seed, (n_students, n_problems) in enumerate([(300, 80), (20, 500), (5, 5)]):
+        student_codes, problem_codes, correct, student_ratings, problem_ratings = _attempts(
+            5_000, n_students, n_problems, seed)
+        waves = assign_waves(student_codes, problem_codes, n_students, n_problems)
+        expected = _sequential(student_codes, problem_codes, correct, student_ratings, problem_ratings)
+        actual = replay(student_codes, problem_codes, correct, student_ratings, problem_ratings, waves)
+        np.testing.assert_allclose(actual[0], expected[0], rtol=0, atol=1e-9)
+        np.testing.assert_allclose(actual[1], expected[1], rtol=0, atol=1e-9)
+
+
+def test_replay_leaves_inputs_unchanged():
+    student_codes, problem_codes, correct, student_ratings, problem_ratings = _attempts(100, 10, 10, seed=3)
+    before = student_ratings.copy(), problem_ratings.copy()
+    replay(student_codes, problem_codes, correct, student_ratings, problem_ratings,
+           assign_waves(student_codes, problem_codes, 10, 10))
+    np.testing.assert_array_equal(student_ratings, before[0])
+    np.testing.assert_array_equal(problem_ratings, before[1])
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from leaderboard import ALL_CITIES, build_leaderboard_index
+
+
+def _active(rows):
+    return pd.DataFrame(rows, columns=['alias', 'user_city', 'num_activities', 'final_curr'])
+
+
+def test_top_k_per_city_in_first_appearance_order():
+    index = build_leaderboard_index(_active([
+        ('a', 'tp', 200, 1500.0), ('b', 'kl', 300, 1700.0), ('c', 'tp', 150, 1900.0),
+        ('a', 'tp', 120, 1700.0), ('d', 'kl', 500, 1600.0),
+    ]), k=1)
+    assert list(index) == [ALL_CITIES, 'tp', 'kl']
+    top_rating, top_attempt = index[ALL_CITIES]
+    assert list(top_rating['alias']) == ['c'] and list(top_attempt['alias']) == ['d']
+    top_rating, top_attempt = index['tp']
+    assert list(top_rating['alias']) == ['c']
+    # A student's activities are summed and ratings averaged across rows
+    assert list(top_attempt['alias']) == ['a'] and top_attempt['attempt_count'].iloc[0] == 320
+
+
+def test_students_without_alias_or_city_are_not_ranked():
+    index = build_leaderboard_index(_active([
+        ('a', 'tp', 200, 1500.0), (None, 'kl', 300, 1700.0), ('b', None, 400, 1800.0),
+    ]))
+    assert list(index) == [ALL_CITIES, 'tp']
+    assert list(index[ALL_CITIES][0]['alias']) == ['a']
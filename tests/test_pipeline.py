@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+
+
+def _log(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2018-08-01')
+    return pd.DataFrame({
+        'uuid': [f'user{i:03d}' for i in rng.integers(0, 200, n_rows)],
+        'timestamp_TW': start + pd.to_timedelta(rng.integers(0, 300 * 86_400, n_rows), unit='s'),
+        'total_sec_taken': rng.integers(1, 600, n_rows),
+    })
+
+
+@pytest.fixture
+def logs(tmp_path):
+    first, second = _log(20_000, seed=0), _log(20_000, seed=1)
+    paths = {'first': tmp_path / 'log_1.parquet', 'second': tmp_path / 'log_2.parquet',
+             'both': tmp_path / 'log_all.parquet'}
+    first.to_parquet(paths['first'])
+    second.to_parquet(paths['second'])
+    pd.concat([first, second], ignore_index=True).to_parquet(paths['both'])
+    # Cohorts only cover rated users; leave some users out
+    pd.DataFrame({'uuid': [f'user{i:03d}' for i in range(0, 200, 3)]}).to_parquet(tmp_path / 'ratings.parquet')
+    return {name: str(path) for name, path in paths.items()}
+
+
+def _run(run, log_paths, out_dir, batch_size=7_000):
+    out_dir.mkdir(exist_ok=True)
+    artifacts = {'time_per_day_path': out_dir / 'time_per_day.parquet', 'cohort_path': out_dir / 'cohort.parquet',
+                 'user_activity_path': out_dir / 'user_activity.parquet'}
+    new_partitions = run(log_paths, rating_path=str(out_dir.parent / 'ratings.parquet'),
+                         state_dir=str(out_dir / 'state'), batch_size=batch_size,
+                         **{name: str(path) for name, path in artifacts.items()})
+    return new_partitions, {name: pd.read_parquet(path) for name, path in artifacts.items()}
+
+
+def test_update_matches_a_full_build(logs, tmp_path):
+    _run(pipeline.build, [logs['first']], tmp_path / 'incremental')
+    new_partitions, incremental = _run(pipeline.update, [logs['first'], logs['second']], tmp_path / 'incremental')
+    assert new_partitions == 1
+    _, full = _run(pipeline.build, [logs['both']], tmp_path / 'full')
+
+    for name in full:
+        pd.testing.assert_frame_equal(incremental[name], full[name])
+
+
+def test_rerun_is_a_no_op(logs, tmp_path):
+    assert _run(pipeline.build, [logs['first']], tmp_path / 'out')[0] == 1
+    assert _run(pipeline.update, [logs['first']], tmp_path / 'out')[0] == 0
+
+
+def test_changed_partition_needs_a_full_build(logs, tmp_path):
+    _run(pipeline.build, [logs['first']], tmp_path / 'out')
+    _log(100, seed=2).to_parquet(logs['first'])
+    with pytest.raises(ValueError, match='full build'):
+        _run(pipeline.update, [logs['first']], tmp_path / 'out')
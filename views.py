@@ -0,0 +1,272 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+from data_layer import (accuracy_histogram, activity_fingerprint, activity_retention_matrix, city_data,
+                        cohort_fingerprint, leaderboard_index, login_range_index, problem_fingerprint,
+                        rating_fingerprint, retention_matrix, time_per_day_fingerprint, time_range_index)
+from date_range_index import downsample_frame, query_range
+from leaderboard import ALL_CITIES
+from sources import FILE_COHORT, FILE_TIME_PER_DAY, FILE_UPID_RATING, FILE_USER_ACTIVITY, FILE_USERDATA, FILE_UUID_RATING
+
+# Figures and the few numbers shown around them for each dashboard view. Every builder returns
+# {'figures': {name: figure}, 'meta': {...}} with JSON-friendly meta, so a view built here can be
+# drawn live by admin_dashboard.py or written out by prerender.py.
+
+# Maximum number of points sent per time-series figure
+MAX_SERIES_POINTS = 1000
+
+# Leaderboard size and the minimum number of activities to be ranked
+LEADERBOARD_K = 5
+MIN_ACTIVITIES = 100
+
+# Heatmaps with more cells than HEATMAP_TEXT_CELLS drop the per-cell text, and matrices with more
+# than HEATMAP_TILE_CELLS are shown one block of cohorts at a time
+HEATMAP_TEXT_CELLS = 600
+HEATMAP_TILE_CELLS = 20_000
+COHORT_PERIODS = {'daily': 'Day', 'weekly': 'Week', 'monthly': 'Month'}
+
+# Source files behind each view; a view rendered ahead of time is out of date once any of them changes
+VIEW_SOURCES = {
+    'demographics': [FILE_UUID_RATING, FILE_USERDATA],
+    'accuracy/student': [FILE_UUID_RATING, FILE_USERDATA],
+    'accuracy/problem': [FILE_UPID_RATING],
+    'engagement': [FILE_UUID_RATING, FILE_USERDATA, FILE_TIME_PER_DAY],
+    'leaderboard': [FILE_UUID_RATING, FILE_USERDATA],
+    'retention/cohort': [FILE_COHORT],
+    'retention/activity': [FILE_USER_ACTIVITY],
+}
+
+
+def demographics_view():
+    # Average rating and student count per city (students with a non-zero rating)
+    df_city = city_data(rating_fingerprint())
+
+    # Create the dual-axis bar chart
+    fig = go.Figure()
+
+    # Add bar chart for student count
+    fig.add_trace(go.Bar(
+        x=df_city['City'],
+        y=df_city['Student Count'],
+        name='Student Count',
+        marker=dict(color='rgba(0, 0, 139, 0.7)')  # Dark blue color
+    ))
+
+    # Add line chart for average rating
+    fig.add_trace(go.Scatter(
+        x=df_city['City'],
+        y=df_city['Average Rating'],
+        name='Average Rating',
+        yaxis='y2',
+        mode='lines+markers',
+        marker=dict(color='rgba(255, 0, 0, 0.7)'),  # Red color
+        line=dict(color='rgba(255, 0, 0, 0.7)')
+    ))
+
+    # Create axis objects
+    fig.update_layout(
+        title={'text': 'Distribution of Students Home Cities and Average Ratings', 'x': 0.5, 'xanchor': 'center'},
+        xaxis=dict(title='City'),
+        yaxis=dict(
+            title='Student Count',
+            titlefont=dict(color='rgba(0, 0, 139, 0.7)'),
+            tickfont=dict(color='rgba(0, 0, 139, 0.7)')
+        ),
+        yaxis2=dict(
+            title='Average Rating',
+            titlefont=dict(color='rgba(255, 0, 0, 0.7)'),
+            tickfont=dict(color='rgba(255, 0, 0, 0.7)'),
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(x=0.1, y=1.1, orientation='h'),
+        plot_bgcolor='rgba(255, 255, 255, 0.9)',
+        paper_bgcolor='rgba(240, 240, 240, 0.9)',
+        height=600  # Adjust height to align with annotation box
+    )
+    return {'figures': {'city': fig}, 'meta': {}}
+
+
+def add_vlines(fig, mean_val, median_val, q1_val, q3_val):
+    fig.add_vline(x=mean_val, line=dict(color='red', width=2, dash='dash'), annotation_text=f"Mean: {mean_val:.2f}", annotation_position="top right")
+    fig.add_vline(x=median_val, line=dict(color='green', width=2, dash='dash'), annotation_text=f"Median: {median_val:.2f}", annotation_position="top right")
+    fig.add_vline(x=q1_val, line=dict(color='blue', width=2, dash='dash'), annotation_text=f"Q1: {q1_val:.2f}", annotation_position="top right")
+    fig.add_vline(x=q3_val, line=dict(color='purple', width=2, dash='dash'), annotation_text=f"Q3: {q3_val:.2f}", annotation_position="top right")
+
+
+def plot_accuracy_distribution(summary, category):
+    fig = go.Figure()
+    # Histogram for accuracy, pre-binned on the server (see accuracy_bins.bin_summary)
+    edges = summary['edges']
+    fig.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=summary['counts'], width=edges[1:] - edges[:-1], name='Accuracy', marker=dict(color='rgba(70, 130, 180, 0.7)', line=dict(color='rgba(70, 130, 180, 1)', width=1.5))))
+
+    # Statistics
+    add_vlines(fig, summary['mean'], summary['median'], summary['q1'], summary['q3'])
+
+    # Update layout
+    fig.update_layout(
+        title={'text': f'Distribution of {category} Accuracy', 'x': 0.5, 'xanchor': 'center'},
+        xaxis=dict(title='Accuracy'),
+        yaxis=dict(title='Count'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=400,
+        margin=dict(l=0, r=0, t=30, b=0)
+    )
+
+    return fig
+
+
+def accuracy_view(source, category):
+    # Per-category accuracy of students or problems, zero accuracy filtered out
+    fingerprint = rating_fingerprint() if source == 'student' else problem_fingerprint()
+    summary = accuracy_histogram(fingerprint, source, category)
+    return {'figures': {'accuracy': plot_accuracy_distribution(summary, category)}, 'meta': {}}
+
+
+def engagement_view(start_date=None, end_date=None):
+    # Login counts and average time per day, indexed by date for range queries
+    login_index = login_range_index(rating_fingerprint())
+    time_index = time_range_index(time_per_day_fingerprint())
+
+    # The slider covers every day with a login; the default window is all of it
+    min_date = login_index['frame']['login_date'].iloc[0]
+    max_date = login_index['frame']['login_date'].iloc[-1]
+    start_date = start_date or min_date
+    end_date = end_date or max_date
+
+    # Filter data based on slider
+    login_window = query_range(login_index, start_date, end_date)
+    time_window = query_range(time_index, start_date, end_date)
+
+    # Downsample wide ranges so the figures stay a bounded size
+    filtered_login_counts = downsample_frame(login_window['frame'], 'login_date', 'user_count', MAX_SERIES_POINTS)
+    filtered_avg_time = downsample_frame(time_window['frame'], 'date', 'total_sec_taken', MAX_SERIES_POINTS)
+
+    # Plot for daily new users
+    fig_login = px.line(
+        filtered_login_counts,
+        x='login_date',
+        y='user_count',
+        title='Number of Users Registered Per Day',
+        line_shape='spline',
+        markers=True
+    )
+
+    fig_login.update_traces(
+        line=dict(color='rgba(0, 0, 139, 0.8)'),  # Dark blue color
+        marker=dict(color='rgba(0, 0, 139, 0.8)', size=5)  # Dark blue color
+    )
+
+    fig_login.update_layout(
+        title={'text': 'Number of Users Registered Per Day', 'x': 0.5, 'xanchor': 'center'},
+        xaxis_title='Date',
+        yaxis_title='Number of Users',
+        plot_bgcolor='rgba(255, 255, 255, 0.9)',  # Light pastel background color
+        paper_bgcolor='rgba(240, 240, 240, 0.9)'  # Light pastel paper background color
+    )
+
+    # Plot for average time spent on platform per day
+    fig_avg_time = px.line(
+        filtered_avg_time,
+        x='date',
+        y='total_sec_taken',
+        title='Average Time Spent on Platform per Day',
+        line_shape='spline',
+        markers=True
+    )
+
+    fig_avg_time.update_traces(
+        line=dict(color='rgba(0, 0, 139, 0.8)'),  # Dark blue color
+        marker=dict(color='rgba(0, 0, 139, 0.8)', size=5)  # Dark blue color
+    )
+
+    fig_avg_time.update_layout(
+        title={'text': 'Average Time Spent on Platform per Day', 'x': 0.5, 'xanchor': 'center'},
+        xaxis_title='Date',
+        yaxis_title='Average Time (seconds)',
+        plot_bgcolor='rgba(255, 255, 255, 0.9)',
+        paper_bgcolor='rgba(240, 240, 240, 0.9)'
+    )
+
+    return {
+        'figures': {'login': fig_login, 'avg_time': fig_avg_time},
+        'meta': {'date_range': [min_date.isoformat(), max_date.isoformat()],
+                 'new_users': login_window['total'], 'avg_time': time_window['mean']},
+    }
+
+
+def leaderboard_records(df):
+    return [{'alias': str(row.alias), 'user_city': str(row.user_city), 'attempt_count': int(row.attempt_count),
+             'average_rating': float(row.average_rating)} for row in df.itertuples()]
+
+
+def leaderboard_view(selected_city=ALL_CITIES):
+    # Top k by average rating and attempt count for every city, precomputed per data load
+    df_leaderboards = leaderboard_index(rating_fingerprint(), k=LEADERBOARD_K, min_activities=MIN_ACTIVITIES)
+    df_rank_rating, df_rank_attempt = df_leaderboards[selected_city]
+
+    # Plot top 5 students by average rating
+    fig_rating = px.bar(df_rank_rating, x='alias', y='average_rating', color='user_city',
+                        title=f'<span style="text-align:center;">Top {LEADERBOARD_K} Highest Rated Students in {selected_city}</span>',
+                        labels={'alias': 'Student Names', 'average_rating': 'Average Rating'},
+                        height=600,
+                        )
+    fig_rating.update_layout(title_x=0.5)  # Center the title
+
+    # Plot top 5 students by attempt count
+    fig_attempt = px.bar(df_rank_attempt, x='alias', y='attempt_count', color='user_city',
+                         title=f'<span style="text-align:center;">Top {LEADERBOARD_K} Most Active Students in {selected_city}</span>',
+                         labels={'alias': 'Student Names', 'attempt_count': 'Attempt Count'},
+                         height=600,)
+    fig_attempt.update_layout(title_x=0.5)  # Center the title
+
+    return {'figures': {'rating': fig_rating, 'attempt': fig_attempt},
+            'meta': {'cities': list(df_leaderboards), 'top_rated': leaderboard_records(df_rank_rating),
+                     'most_active': leaderboard_records(df_rank_attempt)}}
+
+
+def retention_view(granularity=None, tile=0):
+    # Daily, weekly or monthly cohorts from the per-user activity; granularity=None is the
+    # precomputed monthly cohort table
+    if granularity is None:
+        df_retention = retention_matrix(cohort_fingerprint())
+    else:
+        df_retention = activity_retention_matrix(activity_fingerprint(), granularity)
+
+    # Large matrices are split into blocks of cohorts; later cohorts have fewer periods, so the
+    # columns that are empty for a block are dropped
+    rows_per_tile = max(1, HEATMAP_TILE_CELLS // max(1, df_retention.shape[1]))
+    cohort_labels = df_retention.index.astype(str)
+    tiles = [f'{cohort_labels[start]} to {cohort_labels[min(start + rows_per_tile, len(cohort_labels)) - 1]}'
+             for start in range(0, len(df_retention), rows_per_tile)]
+    if len(tiles) > 1:
+        df_retention = df_retention.iloc[tile * rows_per_tile:(tile + 1) * rows_per_tile].dropna(axis=1, how='all')
+    cohort_period = f"Cohort {COHORT_PERIODS[granularity or 'monthly']}"
+
+    blue_white_colorscale = [
+        [0.0, 'rgba(173, 216, 230, 0.1)'],
+        [0.5, 'rgba(173, 216, 230, 0.5)'],
+        [1.0, 'rgba(0, 0, 255, 1)']
+    ]
+
+    fig = px.imshow(
+        df_retention,
+        labels=dict(x="Period Number", y=cohort_period, color="Retention Rate"),
+        x=df_retention.columns.astype(str),
+        y=df_retention.index.astype(str),
+        color_continuous_scale='RdYlGn',
+        text_auto=df_retention.size <= HEATMAP_TEXT_CELLS
+    )
+
+    fig.update_layout(
+        xaxis_title="Period Number",
+        yaxis_title=cohort_period,
+        coloraxis_colorbar=dict(title="Retention Rate"),
+        font=dict(color="black"),  # Set text color to black
+        plot_bgcolor='rgba(255, 255, 255, 0.9)',
+        paper_bgcolor='rgba(240, 240, 240, 0.9)',
+        height=1000,  # Adjust the height of the heatmap
+        width=1200   # Adjust the width of the heatmap
+    )
+    return {'figures': {'retention': fig}, 'meta': {'tiles': tiles}}
+